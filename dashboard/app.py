@@ -2,13 +2,14 @@
 import streamlit as st
 import sys, os, time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))  # db.py's src-relative imports
 
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+import plotly.graph_objects as go  # plotly.express is avoided: it is slow to import
 
-from src.predict_realtime import predict_live
+# src.predict_realtime (model loading, live fetch) is imported on first prediction
 from src.insights import fetch_and_prepare, add_indicators, quick_insights
+from src.chart_data import data_version, prepare_chart_data
 
 st.set_page_config(page_title="Live AI Stock Predictor", layout="wide")
 st.title("📈 Live AI Stock Predictor — Charts & Insights")
@@ -18,32 +19,40 @@ symbols = ["AAPL", "MSFT", "GOOGL"]
 symbol = st.sidebar.selectbox("Symbol", symbols)
 days = st.sidebar.slider("Days back (for chart)", 30, 3650, 365)
 show_indicators = st.sidebar.checkbox("Show indicators (SMA/EMA/RSI/MACD)", True)
+# charts are downsampled server-side to about one point per horizontal pixel
+max_points = st.sidebar.slider("Chart resolution (points)", 300, 4000, 1500, step=100)
 run_pred = st.sidebar.button("Run model prediction")
 
-# small helper: get data from DB (or fallback to yfinance)
-@st.cache_data(ttl=60)
-def load_prices(symbol, days):
-    import sqlalchemy
+# one pooled engine and one delta-fetch price cache per server process (shared by all sessions)
+@st.cache_resource
+def get_engine(db_url):
     from sqlalchemy import create_engine
-    import pandas as pd
-    from datetime import datetime, timedelta
-
-    # read DB URL from env or config, fallback to yfinance if DB fails
+    return create_engine(db_url, pool_pre_ping=True, pool_size=5, max_overflow=5)
+
+@st.cache_resource
+def get_price_cache(backend, db_url):
+    # the configured price store (STORAGE_BACKEND): the prices table or the local Parquet store
+    from db import make_store
+    from src.price_cache import PriceWindowCache
+    return PriceWindowCache(make_store(backend, get_engine(db_url) if db_url else None))
+
+def price_source():
+    """(backend, db url) of the price store, or None when there is none to read (Postgres without DATABASE_URL)."""
+    from config import STORAGE_BACKEND
     db_url = os.environ.get("DATABASE_URL", "")
-    since = (pd.Timestamp.utcnow() - pd.Timedelta(days=days)).strftime("%Y-%m-%d")
-    # try DB
-    if db_url:
-        try:
-            engine = create_engine(db_url)
-            q = f"SELECT ts, open, high, low, close, volume FROM prices WHERE symbol='{symbol}' AND ts >= '{since}' ORDER BY ts"
-            df = pd.read_sql_query(q, engine, parse_dates=["ts"])
-            if not df.empty:
-                df = df.set_index("ts")
-                return df
-        except Exception as e:
-            # fallback to yfinance below
-            st.debug(f"DB load failed: {e}")
-    # fallback: yfinance
+    if STORAGE_BACKEND == "postgres" and not db_url:
+        return None
+    return STORAGE_BACKEND, db_url
+
+# latest scored signal per symbol (written by src/scoring_service.py), one query for the universe
+@st.cache_data(ttl=5)
+def load_signals(db_url, symbols):
+    from src.signals import latest_signals
+    return latest_signals(get_engine(db_url), symbols)
+
+# fallback when the price store has no data
+@st.cache_data(ttl=60)
+def load_prices_yf(symbol, days):
     import yfinance as yf
     df = yf.download(symbol, period=f"{days}d", interval="1d")
     if df.empty:
@@ -53,13 +62,53 @@ def load_prices(symbol, days):
     df.index.name = "ts"
     return df
 
+# small helper: get data from the price store, else yfinance
+def load_prices(symbol, days):
+    source = price_source()
+    if source:
+        try:
+            df = get_price_cache(*source).get(symbol, days)
+            if not df.empty:
+                return df
+        except Exception as e:
+            # fallback below
+            st.sidebar.caption(f"Price store load failed: {e}")
+    return load_prices_yf(symbol, days)
+
 df = load_prices(symbol, days)
+
+if price_source():
+    # price cache counters for operators
+    cs = get_price_cache(*price_source()).stats()
+    with st.sidebar.expander("Price cache"):
+        st.write(f"hits {cs['hits']} · delta queries {cs['deltas']} · full loads {cs['misses']}")
+        st.write(f"{cs['rows']:,} rows cached for {cs['symbols']} symbols, {cs['rows_fetched']:,} fetched")
+        st.write(f"query time {cs['query_seconds'] * 1000:.0f} ms total, last {cs['last_query_seconds'] * 1000:.1f} ms")
+
 if df is None or df.empty:
     st.warning("No price data available for this symbol/timeframe.")
     st.stop()
 
-df = fetch_and_prepare(df)
-df = add_indicators(df)
+# indicator frame and chart data are cached per (symbol, range, data version);
+# the frame itself is passed as an unhashed argument (leading underscore)
+@st.cache_data(max_entries=32)
+def indicator_frame(symbol, days, version, _df):
+    return add_indicators(fetch_and_prepare(_df))
+
+@st.cache_data(max_entries=64)
+def chart_data(symbol, days, version, max_points, _df):
+    return prepare_chart_data(_df, max_points)
+
+# one screener per range, shared by sessions: reruns only feed it bars it has not seen
+@st.cache_resource
+def get_screener(days):
+    from src.screener import UniverseScreener
+    return UniverseScreener()
+
+version = data_version(df)
+df = indicator_frame(symbol, days, version, df)
+chart = chart_data(symbol, days, version, max_points, df)
+candles, lines = chart['candles'], chart['lines']
 
 # Layout: left chart, right KPIs and insights
 left, right = st.columns([3,1])
@@ -68,23 +117,26 @@ with left:
     # Candlestick
     fig = go.Figure()
     fig.add_trace(go.Candlestick(
-        x=df.index, open=df['open'], high=df['high'], low=df['low'], close=df['close'],
+        x=candles.index, open=candles['open'], high=candles['high'], low=candles['low'], close=candles['close'],
         name="price"))
     if show_indicators:
-        if 'sma_10' in df: fig.add_trace(go.Scatter(x=df.index, y=df['sma_10'], name='SMA10', line=dict(width=1)))
-        if 'sma_50' in df: fig.add_trace(go.Scatter(x=df.index, y=df['sma_50'], name='SMA50', line=dict(width=1)))
-        if 'ema_20' in df: fig.add_trace(go.Scatter(x=df.index, y=df['ema_20'], name='EMA20', line=dict(width=1, dash='dot')))
+        if 'sma_10' in lines: fig.add_trace(go.Scatter(x=lines['sma_10'].index, y=lines['sma_10'], name='SMA10', line=dict(width=1)))
+        if 'sma_50' in lines: fig.add_trace(go.Scatter(x=lines['sma_50'].index, y=lines['sma_50'], name='SMA50', line=dict(width=1)))
+        if 'ema_20' in lines: fig.add_trace(go.Scatter(x=lines['ema_20'].index, y=lines['ema_20'], name='EMA20', line=dict(width=1, dash='dot')))
     fig.update_layout(height=600, margin=dict(t=40,b=10))
     st.plotly_chart(fig, use_container_width=True)
+    if chart['rows'] > len(candles):
+        st.caption(f"{chart['rows']:,} bars shown as {len(candles):,} OHLC buckets")
 
     # Volume bar
-    fig2 = px.bar(x=df.index, y=df['volume'], labels={'x':'Date','y':'Volume'}, title="Volume")
+    fig2 = go.Figure(go.Bar(x=candles.index, y=candles['volume'], name="Volume"))
+    fig2.update_layout(title="Volume", xaxis_title="Date", yaxis_title="Volume")
     st.plotly_chart(fig2, use_container_width=True)
 
     # RSI chart
-    if show_indicators and 'rsi' in df:
+    if show_indicators and 'rsi' in lines:
         fig3 = go.Figure()
-        fig3.add_trace(go.Scatter(x=df.index, y=df['rsi'], name='RSI'))
+        fig3.add_trace(go.Scatter(x=lines['rsi'].index, y=lines['rsi'], name='RSI'))
         fig3.update_layout(height=250, yaxis=dict(range=[0,100]), margin=dict(t=20,b=10))
         st.plotly_chart(fig3, use_container_width=True)
 
@@ -102,8 +154,39 @@ with right:
         st.write(f"- {s}")
 
     st.markdown("---")
+    st.header("Universe screen")
+    t0 = time.perf_counter()
+    frames = {sym: load_prices(sym, days) for sym in symbols}
+    panel = pd.DataFrame({sym: fetch_and_prepare(f)['close'] for sym, f in frames.items() if f is not None and not f.empty})
+    screener = get_screener(days)
+    screener.append(panel)
+    table = screener.screen()
+    if table.empty:
+        st.write("No conditions triggered.")
+    else:
+        for row in table.itertuples():
+            st.write(f"- **{row.symbol}** {row.message} ({row.change_pct:+.2f}%)")
+    st.caption(f"{len(panel.columns)} symbols screened in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    st.markdown("---")
+    signal_ts = None
+    if os.environ.get("DATABASE_URL"):
+        try:
+            signals = load_signals(os.environ["DATABASE_URL"], tuple(symbols))
+        except Exception as e:
+            signals = None
+            st.caption(f"signal load failed: {e}")
+        if signals is not None and symbol in signals.index:
+            sig = signals.loc[symbol]
+            signal_ts = sig['ts']
+            age = pd.Timestamp.now(tz="UTC") - sig['ts']
+            st.header("Latest signal")
+            st.success(f"Model says: **{sig['label']}** (P(up) {sig['prob_up']*100:.1f}%)")
+            st.caption(f"bar {sig['ts']:%Y-%m-%d %H:%M} UTC · {age.total_seconds() / 60:.0f} min old · {sig['model_name']}")
+
     if run_pred:
         with st.spinner("Running model..."):
+            from src.predict_realtime import predict_live
             action, confidence = predict_live(symbol)
             if action is None:
                 st.error("Model or live data not available.")
@@ -111,18 +194,41 @@ with right:
                 st.success(f"Model says: **{action}**")
                 st.write(f"Confidence: {confidence*100:.2f}%")
 
-# feature importance: try to show model importance if model exists
-import joblib, pathlib
-model_file = pathlib.Path(__file__).parents[1] / "models" / f"{symbol}.pkl"
-if model_file.exists():
+# SHAP explanations: batched per model over the shown bars and cached per (model hash, bar),
+# so reruns and newly appended bars only compute what has not been explained yet
+@st.cache_resource
+def get_explainer():
+    from src.explain import Explainer
+    return Explainer()
+
+explainer = get_explainer()
+if explainer.model_path(symbol) is not None:
     try:
-        model = joblib.load(str(model_file))
-        # try LightGBM booster or sklearn estimator with feature_importances_
-        import numpy as np
-        if hasattr(model, "feature_importances_"):
-            fi = model.feature_importances_
-            features = ["close", "volume", "high", "low"]  # adjust if different
-            fig_fi = px.bar(x=features, y=fi, labels={'x':'feature','y':'importance'}, title="Feature importance")
-            st.plotly_chart(fig_fi, use_container_width=True)
+        from src.features import compute_features
+        from src.explain import feature_names
+        names = feature_names(symbol, explainer.model_dir)
+        X = compute_features(df[['close']].copy(), names)
+        before = explainer.stats()
+        t0 = time.perf_counter()
+        importance = explainer.global_importance(symbol, X)
+        attribution = explainer.attribution(symbol, X, signal_ts)
+        elapsed = time.perf_counter() - t0
+        after = explainer.stats()
+        if importance is not None:
+            fi_left, fi_right = st.columns(2)
+            with fi_left:
+                fig_fi = go.Figure(go.Bar(x=importance.index, y=importance.values))
+                fig_fi.update_layout(title="Feature importance (mean |SHAP|)", xaxis_title="feature", yaxis_title="mean |SHAP| (log-odds)")
+                st.plotly_chart(fig_fi, use_container_width=True)
+            with fi_right:
+                contrib = attribution[names]
+                fig_at = go.Figure(go.Bar(x=contrib.values, y=contrib.index, orientation="h",
+                                          marker_color=["#2ca02c" if v > 0 else "#d62728" for v in contrib.values]))
+                fig_at.update_layout(title=f"Why: bar {attribution.name:%Y-%m-%d %H:%M}",
+                                     xaxis_title=f"SHAP (log-odds, base {attribution['base_value']:+.3f})")
+                st.plotly_chart(fig_at, use_container_width=True)
+            computed = after["rows_computed"] - before["rows_computed"]
+            st.caption(f"{len(X.dropna()):,} bars explained · {computed:,} computed, "
+                       f"{len(X.dropna()) - computed:,} from cache · {elapsed * 1000:.0f} ms")
     except Exception as e:
-        st.write("Could not load model for feature importance.")
+        st.caption(f"SHAP explanation failed: {e}")
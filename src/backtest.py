@@ -1,37 +1,154 @@
 import pandas as pd
-import joblib
-from db import engine
-
-def backtest(symbol, model_path):
-    df = pd.read_sql(f"SELECT * FROM prices WHERE symbol='{symbol}' ORDER BY ts", engine)
-    df = df.sort_values('ts').reset_index(drop=True)
-    # create features as in training
-    df['return_1'] = df['close'].pct_change()
-    df['ma_5'] = df['close'].rolling(5).mean()
-    df['ma_20'] = df['close'].rolling(20).mean()
-    df['rsi_14'] = df['close'].rolling(14).apply(lambda x: (x.diff().gt(0).sum())/len(x))
-    df = df.dropna().reset_index(drop=True)
-    X = df[['return_1','ma_5','ma_20','rsi_14']].values
-    model = joblib.load(model_path)
-    probs = model.predict_proba(X)[:,1]
-    df['prob_up'] = probs
-    df['pred'] = (probs > 0.6).astype(int)  # threshold
-    # simulate
-    trades=[]
-    equity=1.0
-    for i in range(len(df)-1):
-        if df.loc[i,'pred'] == 1:
-            # buy at next open, sell at next close
-            entry = df.loc[i+1,'open']
-            exit = df.loc[i+1,'close']
-            ret = (exit/entry)-1
-            equity *= (1+ret)
-            trades.append(ret)
-    total_return = equity - 1
-    import numpy as np
-    cagr = (1+total_return)**(252/len(df)) - 1
-    print("total_return", total_return, "CAGR approx", cagr, "trades", len(trades))
-    return trades
+import numpy as np
+import lightgbm as lgb
+from db import read_prices_since
+from features import MODEL_FEATURES as FEATURES, FeatureCache
+
+feature_cache = FeatureCache()
+
+
+def load_backtest_frame(symbol):
+    # same (cached) features as in training
+    df = feature_cache.get(symbol, read_prices_since)
+    df = df.dropna(subset=FEATURES).reset_index(drop=True)
+    return df
+
+
+def trade_returns(open_, close, holding_period=1):
+    """
+    Return of a trade signalled at bar i: buy at open[i+1], sell at close[i+holding_period].
+    NaN where the exit bar is past the end of the data.
+    """
+    n = len(open_)
+    out = np.full(n, np.nan)
+    if n > holding_period:
+        entry = open_[1:n - holding_period + 1]
+        exit_ = close[holding_period:]
+        out[:n - holding_period] = exit_ / entry - 1
+    return out
+
+
+def flat_signals(active, holding_period=1):
+    """
+    Drop signals that arrive while a trade is open: a trade signalled at bar i holds
+    bars i+1..i+holding_period, so the next one can be signalled at i+holding_period.
+    active: (n,) or (k, n) bool; returns (k, n). The loop runs once per kept trade.
+    """
+    active = np.atleast_2d(active)
+    if holding_period <= 1:
+        return active
+    out = np.zeros_like(active)
+    for k, row in enumerate(active):
+        idx = np.flatnonzero(row)
+        pos = 0
+        while pos < len(idx):
+            out[k, idx[pos]] = True
+            pos = np.searchsorted(idx, idx[pos] + holding_period)
+    return out
+
+
+def strategy_returns(df, probs, threshold=0.6, holding_period=1, cost=0.0):
+    """
+    Per-bar strategy returns and positions for one grid point, on the bars a trade is held.
+    A trade signalled at bar i holds bars i+1..i+holding_period: open -> close on its entry
+    bar, close -> close after that, and the round-trip cost on its exit bar, so the returns
+    of its bars compound to the trade return minus cost (what backtest_grid books).
+    Returns (per-bar returns, bool positions), both 0 / False outside trades.
+    """
+    open_ = df['open'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    n = len(close)
+    raw = trade_returns(open_, close, holding_period)
+    signal = flat_signals((np.asarray(probs, dtype=float) > threshold) & ~np.isnan(raw), holding_period)[0]
+    entry = np.flatnonzero(signal) + 1
+    exit_ = entry + holding_period - 1
+
+    held = np.zeros(n + 1, dtype=int)
+    np.add.at(held, entry, 1)
+    np.add.at(held, exit_ + 1, -1)
+    positions = np.cumsum(held[:n]) > 0
+
+    bar = np.zeros(n)
+    bar[1:] = close[1:] / close[:-1] - 1
+    bar[entry] = close[entry] / open_[entry] - 1
+    # cost in units of the capital at the exit bar's start: the trade compounds to raw - cost
+    grown = close[exit_ - 1] / open_[entry] if holding_period > 1 else np.ones(len(entry))
+    per_bar = np.where(positions, bar, 0.0)
+    per_bar[exit_] -= cost / grown
+    return per_bar, positions
+
+
+def _max_drawdown(equity):
+    # equity: (k, n) -> (k,); the curve starts at the initial capital of 1.0
+    equity = np.hstack([np.ones((equity.shape[0], 1)), equity])
+    peak = np.maximum.accumulate(equity, axis=1)
+    return (equity / peak - 1).min(axis=1)
+
+
+def backtest_grid(df, probs, thresholds=(0.6,), holding_periods=(1,), costs=(0.0,), periods_per_year=252):
+    """
+    Vectorized backtest over a grid of probability thresholds x holding periods x costs.
+
+    Each signal (prob_up > threshold) is a trade entered at the next bar's open and
+    exited at the close holding_period bars later, with all capital; signals while a
+    trade is open are skipped, so trades never overlap and compound in signal order
+    (same as the original loop for holding_period=1). costs are round-trip,
+    as a fraction of the trade, subtracted from each trade's return.
+
+    Returns a tidy DataFrame with one row per grid point.
+    """
+    open_ = df['open'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    probs = np.asarray(probs, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+    n = len(close)
+
+    # signals for every threshold at once: (T, n)
+    signals = probs[None, :] > thresholds[:, None]
+
+    rows = []
+    for hold in holding_periods:
+        raw = trade_returns(open_, close, hold)
+        valid = ~np.isnan(raw)
+        raw = np.where(valid, raw, 0.0)
+        active = flat_signals(signals & valid[None, :], hold)
+        n_trades = active.sum(axis=1)
+        for cost in costs:
+            per_bar = np.where(active, raw[None, :] - cost, 0.0)  # (T, n)
+            equity = np.cumprod(1 + per_bar, axis=1)
+            total_return = equity[:, -1] - 1 if n else np.zeros(len(thresholds))
+            cagr = (1 + total_return) ** (periods_per_year / max(n, 1)) - 1
+            std = per_bar.std(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sharpe = np.where(std > 0, per_bar.mean(axis=1) / std * np.sqrt(periods_per_year), np.nan)
+                win_rate = np.where(n_trades > 0, ((per_bar > 0) & active).sum(axis=1) / n_trades, np.nan)
+            max_dd = _max_drawdown(equity) if n else np.zeros(len(thresholds))
+            for k, thr in enumerate(thresholds):
+                rows.append({
+                    'threshold': thr,
+                    'holding_period': hold,
+                    'cost': cost,
+                    'trades': int(n_trades[k]),
+                    'total_return': total_return[k],
+                    'cagr': cagr[k],
+                    'sharpe': sharpe[k],
+                    'max_drawdown': max_dd[k],
+                    'win_rate': win_rate[k],
+                })
+    return pd.DataFrame(rows)
+
+
+def backtest(symbol, model_path, thresholds=(0.6,), holding_periods=(1,), costs=(0.0,)):
+    df = load_backtest_frame(symbol)
+    X = df[FEATURES].values
+    # the native text model written by train_model.save_model; a binary Booster predicts P(up)
+    probs = lgb.Booster(model_file=model_path).predict(X)
+    results = backtest_grid(df, probs, thresholds, holding_periods, costs)
+    print(results.to_string(index=False))
+    return results
 
 if __name__ == "__main__":
-    backtest("AAPL", "models/AAPL_lgbm.pkl")
+    backtest("AAPL", "models/AAPL_lgbm.txt",
+             thresholds=(0.5, 0.55, 0.6, 0.65, 0.7),
+             holding_periods=(1, 5),
+             costs=(0.0, 0.0005, 0.001))
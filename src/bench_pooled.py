@@ -0,0 +1,95 @@
+# benchmark: one pooled LightGBM model (train_model.train_pooled) vs one model per symbol (train_many)
+# usage: python src/bench_pooled.py [n_symbols] [bars_per_symbol] [--categorical] [--symbols AAPL,MSFT,...]
+# default: synthetic daily bars in a temp Parquet store; --symbols trains on the configured price
+# backend instead. Models and the feature cache go to a temp dir either way.
+# report: total training time, model bytes in memory after loading every symbol's model through a
+# ModelRegistry (tracemalloc: NumPy trees of native models; a pickled categorical model keeps its
+# trees in LightGBM's C++ heap, so compare bytes on disk there), bytes on disk, and out-of-fold
+# accuracy (5-fold time-series CV).
+# live scoring with the pooled model (predict_live, predict_many, ScoringService):
+# tests/test_live_scoring.py
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+
+WORK = tempfile.mkdtemp(prefix="bench_pooled_")
+if "--symbols" not in sys.argv:
+    os.environ["STORAGE_BACKEND"] = "parquet"
+    os.environ["PARQUET_ROOT"] = os.path.join(WORK, "prices")
+    os.environ.setdefault("DB_URI", "sqlite://")
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+import train_model
+from db import write_prices
+from features import FeatureCache
+from synthetic_data import generate_universe
+from src.model_registry import ModelRegistry
+
+
+def loaded_bytes(model_dir, symbols, pooled):
+    """(Python heap bytes held by the loaded models, load seconds) for every symbol via a fresh registry."""
+    registry = ModelRegistry(model_dir=model_dir, max_bytes=float("inf"), pooled=pooled)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    models = [registry.get(s) for s in symbols]
+    seconds = time.perf_counter() - t0
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert all(m is not None for m in models)
+    return held, seconds
+
+
+def disk_bytes(model_dir):
+    return sum(os.path.getsize(os.path.join(model_dir, f)) for f in os.listdir(model_dir))
+
+
+def run(symbols, categorical=False):
+    per_dir, pooled_dir = os.path.join(WORK, "per_symbol"), os.path.join(WORK, "pooled")
+    train_model.feature_cache = FeatureCache(root=os.path.join(WORK, "features"))
+
+    t0 = time.perf_counter()
+    per = train_model.train_many(symbols, model_dir=per_dir)
+    per_seconds = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pooled = train_model.train_pooled(symbols, model_dir=pooled_dir, categorical=categorical)
+    pooled_seconds = time.perf_counter() - t0
+
+    per_mem, per_load = loaded_bytes(per_dir, symbols, "off")
+    pooled_mem, pooled_load = loaded_bytes(pooled_dir, symbols, "prefer")
+    acc = pd.DataFrame({"per_symbol": per.set_index("symbol")["cv_acc"], "pooled": pd.Series(pooled["acc_by_symbol"])})
+    rows_weighted = np.average(per["cv_acc"], weights=per["rows"])
+
+    print(f"\n{len(symbols)} symbols, {int(per['rows'].sum()):,} training rows"
+          f"{' (pooled: symbol as categorical feature)' if categorical else ''}")
+    print(f"{'':<28} {'per-symbol':>14} {'pooled':>14}")
+    print(f"{'training wall time (s)':<28} {per_seconds:>14.1f} {pooled_seconds:>14.1f}")
+    print(f"{'models':<28} {len(symbols):>14} {1:>14}")
+    print(f"{'bytes in memory (loaded)':<28} {per_mem:>14,} {pooled_mem:>14,}")
+    print(f"{'bytes on disk':<28} {disk_bytes(per_dir):>14,} {disk_bytes(pooled_dir):>14,}")
+    print(f"{'cold load, all symbols (ms)':<28} {per_load * 1000:>14.1f} {pooled_load * 1000:>14.1f}")
+    print(f"{'CV accuracy (row-weighted)':<28} {rows_weighted:>14.4f} {pooled['cv_acc']:>14.4f}")
+    print(f"{'CV accuracy (symbol mean)':<28} {acc['per_symbol'].mean():>14.4f} {acc['pooled'].mean():>14.4f}")
+    print(f"pooled better on {(acc['pooled'] > acc['per_symbol']).sum()} of {len(acc)} symbols")
+    return acc
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    try:
+        if "--symbols" in sys.argv:
+            symbols = sys.argv[sys.argv.index("--symbols") + 1].upper().split(",")
+        else:
+            n_symbols = int(args[0]) if args else 20
+            bars = int(args[1]) if len(args) > 1 else 2_000
+            universe = generate_universe(n_symbols, bars, "daily", seed=17)
+            universe["source"] = "bench"
+            write_prices(universe)
+            symbols = sorted(universe["symbol"].unique())
+        run(symbols, categorical="--categorical" in sys.argv)
+    finally:
+        shutil.rmtree(WORK, ignore_errors=True)
@@ -0,0 +1,83 @@
+# benchmark: per-symbol time-range reads on a generated multi-million-row prices table
+# usage: python src/bench_read_range.py [n_symbols] [bars_per_symbol]
+import sys
+import time
+from sqlalchemy import text
+from db import engine, read_range
+
+TABLE = "prices_bench"
+
+
+def build_table(n_symbols, bars):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(text(f"""
+            CREATE TABLE {TABLE} (
+              id serial PRIMARY KEY, symbol varchar(20), ts timestamptz,
+              open numeric, high numeric, low numeric, close numeric, volume bigint, source varchar(50)
+            )
+        """))
+        # minute bars, rows interleaved by time like a live ingest would write them
+        conn.execute(text(f"""
+            INSERT INTO {TABLE} (symbol, ts, open, high, low, close, volume, source)
+            SELECT 'SYM' || s, timestamptz '2015-01-01' + make_interval(mins => b),
+                   100 + random(), 101 + random(), 99 + random(), 100 + random(),
+                   (random() * 10000)::bigint, 'bench'
+            FROM generate_series(0, :bars - 1) AS b, generate_series(1, :n) AS s
+        """), {"bars": bars, "n": n_symbols})
+        conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def add_indexes():
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE UNIQUE INDEX {TABLE}_symbol_ts_key ON {TABLE} (symbol, ts)"))
+        conn.execute(text(f"CREATE INDEX {TABLE}_ts_brin ON {TABLE} USING brin (ts)"))
+        conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def timed(label, fn, repeat=3):
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = len(fn())
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<45} {rows:>9} rows  {best * 1000:>9.1f} ms")
+    return best
+
+
+def legacy_read(symbol, limit):
+    # the old read_prices pattern: no time filter, guessed row count
+    with engine.connect() as conn:
+        return conn.execute(
+            text(f"SELECT * FROM {TABLE} WHERE symbol = :s ORDER BY ts DESC LIMIT :l"), {"s": symbol, "l": limit}
+        ).fetchall()
+
+
+def run_queries(tag):
+    day = ("2015-01-02", "2015-01-03")
+    return {
+        "legacy_limit": timed(f"[{tag}] SELECT * ORDER BY ts DESC LIMIT", lambda: legacy_read("SYM1", 1440)),
+        "one_symbol_day": timed(f"[{tag}] read_range 1 symbol, 1 day", lambda: read_range(
+            "SYM1", *day, columns=["close"], table=TABLE)),
+        "ten_symbols_day": timed(f"[{tag}] read_range 10 symbols, 1 day", lambda: read_range(
+            [f"SYM{i}" for i in range(1, 11)], *day, columns=["close", "volume"], table=TABLE)),
+    }
+
+
+if __name__ == "__main__":
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    bars = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    print(f"Building {TABLE}: {n_symbols} symbols x {bars} bars = {n_symbols * bars:,} rows")
+    t0 = time.perf_counter()
+    build_table(n_symbols, bars)
+    print(f"built in {time.perf_counter() - t0:.1f}s")
+
+    before = run_queries("no index")
+    add_indexes()
+    after = run_queries("indexed")
+    for k in before:
+        print(f"{k}: {before[k] / after[k]:.1f}x faster with (symbol, ts) index")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
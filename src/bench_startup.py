@@ -0,0 +1,56 @@
+# benchmark: cold-start cost of a prediction worker (fresh interpreter per run)
+# usage: python src/bench_startup.py [symbol] [repeats]
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import numpy as np
+from src.model_registry import ModelRegistry
+t_import = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+registry = ModelRegistry(prefer_native={native})
+model = registry.get({symbol!r})
+t_load = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+# one MODEL_FEATURES row: return_1, ma_5, ma_20, up_ratio_14
+proba = model.predict_proba(np.array([[0.002, 150.0, 148.5, 0.57]]))
+t_predict = time.perf_counter() - t0
+print(json.dumps({{"import": t_import, "load": t_load, "first_predict": t_predict}}))
+"""
+
+
+def run(native, symbol):
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", SNIPPET.format(native=native, symbol=symbol)],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def import_time(module):
+    code = f"import time; t=time.perf_counter(); import {module}; print(time.perf_counter()-t)"
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    symbol = sys.argv[1] if len(sys.argv) > 1 else "AAPL"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print("module import (cold):")
+    for module in ["src.predict_realtime", "src.insights", "plotly.graph_objects", "plotly.express", "lightgbm", "yfinance"]:
+        print(f"  {module:<24} {min(import_time(module) for _ in range(repeats)) * 1000:8.1f} ms")
+
+    print(f"\nfirst prediction for {symbol} (best of {repeats}):")
+    for label, native in [("pickle (joblib + sklearn)", False), ("native text model", True)]:
+        runs = [run(native, symbol) for _ in range(repeats)]
+        best = {k: min(r[k] for r in runs) for k in runs[0]}
+        total = best["import"] + best["load"] + best["first_predict"]
+        print(f"  {label:<26} import {best['import'] * 1000:7.1f} ms  load {best['load'] * 1000:7.1f} ms  "
+              f"predict {best['first_predict'] * 1000:6.1f} ms  total {total * 1000:7.1f} ms")
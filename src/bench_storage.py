@@ -0,0 +1,114 @@
+# benchmark: local Parquet store vs the Postgres prices table on the same synthetic minute bars
+# usage: python src/bench_storage.py [n_symbols] [bars_per_symbol] [--postgres]
+# the Parquet side always runs (temp dir); --postgres also loads a prices_bench table via db.engine
+# the Parquet run ends with a check: several processes upsert bars into the same year files at
+# once, and no row may be lost to a concurrent read-merge-rewrite
+import os
+import sys
+import time
+import shutil
+import tempfile
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import text
+from db import engine, _pg_write_prices, _pg_read_range, _pg_iter_range
+from storage import ParquetStore
+from synthetic_data import generate_universe
+
+TABLE = "prices_bench"
+
+
+class PostgresBenchTable:
+    """The PriceStore read/write calls, pointed at the benchmark table."""
+
+    def __init__(self):
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            conn.execute(text(f"""
+                CREATE TABLE {TABLE} (
+                  id serial PRIMARY KEY, symbol varchar(20), ts timestamptz,
+                  open numeric, high numeric, low numeric, close numeric, volume bigint, source varchar(50),
+                  CONSTRAINT {TABLE}_symbol_ts_key UNIQUE (symbol, ts)
+                )
+            """))
+
+    def write_prices(self, df):
+        stats = _pg_write_prices(df, table=TABLE)
+        with engine.begin() as conn:
+            conn.execute(text(f"ANALYZE {TABLE}"))
+        return stats
+
+    def read_range(self, symbols, start=None, end=None, columns=None):
+        return _pg_read_range(symbols, start, end, columns, table=TABLE)
+
+    def iter_range(self, symbol, start=None, end=None, columns=("close",), chunk_rows=100_000):
+        return _pg_iter_range(symbol, start, end, columns, chunk_rows, table=TABLE)
+
+
+def timed(label, fn, repeat=3):
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"  {label:<40} {rows:>10,} rows  {best * 1000:>9.1f} ms")
+    return best
+
+
+def run(store, universe, symbols):
+    t0 = time.perf_counter()
+    store.write_prices(universe)
+    print(f"  {'bulk load':<40} {len(universe):>10,} rows  {(time.perf_counter() - t0) * 1000:>9.1f} ms")
+    first, last = universe["ts"].min(), universe["ts"].max()
+    mid = first + (last - first) / 2
+    week = (mid, mid + pd.Timedelta(days=7))
+    timed("one symbol, full history", lambda: len(store.read_range(symbols[0])))
+    timed("one symbol, close only", lambda: len(store.read_range(symbols[0], columns=["close"])))
+    timed("one symbol, one week", lambda: len(store.read_range(symbols[0], *week)))
+    timed(f"{min(10, len(symbols))} symbols, one week", lambda: len(store.read_range(symbols[:10], *week)))
+    timed("one symbol, streamed (iter_range)",
+          lambda: sum(len(c) for c in store.iter_range(symbols[0], columns=["close"], chunk_rows=100_000)))
+
+
+def _write_slices(root, frame, worker, workers):
+    # every worker upserts its own bars, one at a time, into the shared partitions
+    store = ParquetStore(root)
+    for i in range(worker, len(frame), workers):
+        store.write_prices(frame.iloc[i:i + 1])
+    return worker
+
+
+def check_concurrent_writes(root, universe, workers=4, rows=200):
+    frame = universe.groupby("symbol").head(rows // 2).head(rows).reset_index(drop=True)
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_write_slices, [root] * workers, [frame] * workers, range(workers), [workers] * workers))
+    stored = ParquetStore(root).read_range(sorted(frame["symbol"].unique()))
+    assert len(stored) == len(frame), f"{len(frame) - len(stored)} rows lost by concurrent writers"
+    print(f"  {workers} writer processes, {len(frame)} single-row upserts: no rows lost "
+          f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n_symbols = int(args[0]) if args else 20
+    bars = int(args[1]) if len(args) > 1 else 200_000
+    universe = generate_universe(n_symbols, bars, "minute", seed=11)
+    universe["source"] = "bench"
+    symbols = sorted(universe["symbol"].unique())
+    print(f"{n_symbols} symbols x {bars:,} minute bars = {len(universe):,} rows")
+
+    root = tempfile.mkdtemp(prefix="bench_parquet_")
+    try:
+        print("parquet (local, memory-mapped):")
+        run(ParquetStore(root), universe, symbols)
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(root) for f in fs)
+        print(f"  on disk: {size / 2**20:.1f} MiB")
+        check_concurrent_writes(os.path.join(root, "concurrent"), universe)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if "--postgres" in sys.argv:
+        print(f"postgres ({TABLE}):")
+        run(PostgresBenchTable(), universe, symbols)
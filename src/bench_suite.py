@@ -0,0 +1,246 @@
+# benchmark suite: time + peak memory of the pipeline's hot paths on synthetic bars
+# usage:
+#   python src/bench_suite.py [--sizes 10000,100000,1000000] [--stages add_indicators,backtest]
+#                             [--repeat 3] [--out bench_results/run.json]
+#                             [--compare baseline.json] [--threshold 0.25]
+# fully offline: bars come from synthetic_data, the DB is an in-memory SQLite, live quotes
+# come from a FixtureSource and models from a temp ModelRegistry. write_prices (Postgres
+# COPY + ON CONFLICT) has no SQLite stand-in and is not covered here.
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("DB_URI", "sqlite://")
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from synthetic_data import generate_symbol, generate_universe, to_yfinance
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+
+def _daily(size, seed=7):
+    return generate_symbol(size, "daily", seed=seed)
+
+
+def stage_add_indicators(size):
+    from insights import fetch_and_prepare, add_indicators
+    df = _daily(size).set_index("ts")
+    return lambda: add_indicators(fetch_and_prepare(df.copy()))
+
+
+def stage_create_features(size):
+    from feature_engineering import create_features
+    df = _daily(size)
+    return lambda: create_features(df.copy())
+
+
+def stage_prepare_ml_df(size):
+    from train_model import prepare_ml_df
+    df = _daily(size)
+    return lambda: prepare_ml_df(df.copy())
+
+
+def stage_backtest(size):
+    from train_model import prepare_ml_df
+    from backtest import backtest_grid
+    df = prepare_ml_df(_daily(size))
+    probs = np.random.default_rng(1).uniform(0.3, 0.8, len(df))
+    return lambda: backtest_grid(df, probs, thresholds=(0.55, 0.6, 0.65), holding_periods=(1, 5), costs=(0.0, 0.001))
+
+
+def stage_screen(size):
+    # size bars spread over 100 symbols: full screener load + ranked screen
+    from screener import UniverseScreener
+    universe = generate_universe(100, max(size // 100, 60), "daily", seed=3)
+    panel = universe.pivot(index="ts", columns="symbol", values="close")
+    def run():
+        screener = UniverseScreener()
+        screener.load(panel)
+        return screener.screen()
+    return run
+
+
+def stage_read_range(size):
+    # size rows spread over 10 symbols in an in-memory SQLite; read one symbol's last half
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from db import read_range
+    con = create_engine("sqlite://", poolclass=StaticPool)
+    universe = generate_universe(10, max(1, size // 10), "daily", seed=3)
+    universe.assign(ts=universe["ts"].dt.tz_localize(None)).to_sql("prices", con, index=False, chunksize=50_000)
+    with con.begin() as c:
+        c.exec_driver_sql("CREATE UNIQUE INDEX prices_symbol_ts_key ON prices (symbol, ts)")
+    start = universe["ts"].iloc[len(universe) // 20].tz_localize(None)
+    return lambda: read_range("SYM0001", start=start, con=con)
+
+
+_model_dir = None
+
+
+def _model_dir_for(symbols):
+    # one small model trained on synthetic bars, copied for every symbol of the universe
+    global _model_dir
+    import lightgbm as lgb
+    from src.native_model import save_native
+    from src.features import MODEL_FEATURES, compute_features
+    if _model_dir is None:
+        _model_dir = tempfile.mkdtemp(prefix="bench_models_")
+        df = compute_features(_daily(5_000), MODEL_FEATURES)
+        y = (df["close"].shift(-1) > df["close"]).astype(int)
+        model = lgb.LGBMClassifier(n_estimators=100, verbose=-1).fit(df[MODEL_FEATURES].values, y.values)
+        save_native(model, os.path.join(_model_dir, "template.txt"))
+    for sym in symbols:
+        path = os.path.join(_model_dir, f"{sym}_lgbm.txt")
+        if not os.path.exists(path):
+            shutil.copyfile(os.path.join(_model_dir, "template.txt"), path)
+    return _model_dir
+
+
+def _live_fixture(symbols):
+    import src.predict_realtime as predict_realtime
+    from src.fetch_live import FixtureSource, set_source
+    from src.model_registry import ModelRegistry
+    frames = {s: to_yfinance(generate_symbol(30, "minute", seed=i, start="2026-01-05 14:30")) for i, s in enumerate(symbols)}
+    set_source(FixtureSource(frames))
+    registry = ModelRegistry(model_dir=_model_dir_for(symbols))
+    predict_realtime.registry = registry
+    for s in symbols:
+        registry.get(s)  # warm registry: measure the steady-state request path
+    return predict_realtime
+
+
+def stage_predict_live(size):
+    # size is ignored: one symbol, live fetch (cache cleared) + cached model + predict
+    from src.fetch_live import clear_cache
+    predict_realtime = _live_fixture(["SYM0001"])
+    def run():
+        clear_cache()
+        return predict_realtime.predict_live("SYM0001")
+    return run
+
+
+def stage_predict_many(size):
+    # one symbol per 1000 rows of the size, at most 1000 symbols
+    from src.fetch_live import clear_cache
+    symbols = [f"SYM{i + 1:04d}" for i in range(min(1000, max(1, size // 1000)))]
+    predict_realtime = _live_fixture(symbols)
+    def run():
+        clear_cache()
+        return predict_realtime.predict_many(symbols)
+    return run
+
+
+STAGES = {
+    "add_indicators": stage_add_indicators,
+    "create_features": stage_create_features,
+    "prepare_ml_df": stage_prepare_ml_df,
+    "backtest": stage_backtest,
+    "screen": stage_screen,
+    "read_range": stage_read_range,
+    "predict_live": stage_predict_live,
+    "predict_many": stage_predict_many,
+}
+
+
+def measure(fn, repeat):
+    """(best seconds, median seconds, peak traced bytes); memory comes from a separate traced run."""
+    fn()  # warm-up: imports, caches, first-call allocations
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), float(np.median(times)), peak
+
+
+def run_suite(stages, sizes, repeat=3):
+    results = []
+    for name in stages:
+        for size in sizes:
+            fn = STAGES[name](size)
+            best, median, peak = measure(fn, repeat)
+            results.append({"stage": name, "size": size, "time_best": best, "time_median": median,
+                            "peak_mem_bytes": peak})
+            print(f"{name:<16} {size:>10,}  best {best * 1000:9.2f} ms  median {median * 1000:9.2f} ms  "
+                  f"peak {peak / 2**20:8.1f} MiB")
+    return {
+        "meta": {
+            "created": pd.Timestamp.now(tz="UTC").isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.25, min_seconds=0.002):
+    """
+    Rows where time_best or peak memory grew by more than `threshold` (fraction) vs the baseline.
+    Time increases smaller than min_seconds are ignored (timer noise on tiny stages).
+    """
+    base = {(r["stage"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["stage"], r["size"]))
+        if b is None:
+            continue
+        for key in ("time_best", "peak_mem_bytes"):
+            ratio = r[key] / b[key] if b[key] else 1.0
+            if key == "time_best" and r[key] - b[key] < min_seconds:
+                continue
+            if ratio > 1.0 + threshold:
+                regressions.append({"stage": r["stage"], "size": r["size"], "metric": key,
+                                    "baseline": b[key], "current": r[key], "ratio": ratio})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="offline benchmark suite")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", default=None, help="baseline results JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown / memory growth")
+    parser.add_argument("--min-seconds", type=float, default=0.002, help="ignore smaller absolute slowdowns")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {sorted(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    report = run_suite(stages, sizes, args.repeat)
+    out = args.out or os.path.join("bench_results", f"{pd.Timestamp.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔ results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_seconds)
+        for r in regressions:
+            print(f"❌ {r['stage']} @ {r['size']:,}: {r['metric']} {r['ratio']:.2f}x baseline")
+        if regressions:
+            sys.exit(1)
+        print(f"✔ no regressions beyond {args.threshold:.0%}")
+    if _model_dir:
+        shutil.rmtree(_model_dir, ignore_errors=True)
@@ -0,0 +1,82 @@
+# src/chart_data.py
+"""
+Chart-ready data for the dashboard: the indicator frame is reduced to roughly one point
+per horizontal pixel before it is handed to Plotly.
+- candles / volume: OHLC-preserving bucket aggregation (first open, max high, min low,
+  last close, summed volume), so every wick in the full history stays visible
+- indicator lines: Largest-Triangle-Three-Buckets (LTTB), which keeps the visual peaks
+"""
+import numpy as np
+import pandas as pd
+
+
+def data_version(df):
+    """Cheap fingerprint of a price frame, used as part of the cache key."""
+    if df is None or df.empty:
+        return (0, None)
+    return (len(df), str(df.index[-1]), float(df['close'].iloc[-1]))
+
+
+def _bucket_starts(n, n_buckets):
+    return np.unique(np.linspace(0, n, n_buckets + 1, dtype=np.int64)[:-1])
+
+
+def ohlc_downsample(df, max_points):
+    """Aggregate consecutive rows into at most max_points OHLCV buckets (indexed by each bucket's first ts)."""
+    n = len(df)
+    if n <= max_points:
+        return df[['open', 'high', 'low', 'close', 'volume']]
+    starts = _bucket_starts(n, max_points)
+    ends = np.append(starts[1:], n) - 1
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    volume = df['volume'].to_numpy(dtype=float)
+    return pd.DataFrame({
+        'open': df['open'].to_numpy(dtype=float)[starts],
+        'high': np.fmax.reduceat(high, starts),
+        'low': np.fmin.reduceat(low, starts),
+        'close': df['close'].to_numpy(dtype=float)[ends],
+        'volume': np.add.reduceat(np.nan_to_num(volume), starts),
+    }, index=df.index[starts])
+
+
+def lttb_indices(y, n_out):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets decimation.
+    x is taken as the row position (bars are evenly spaced in time for a chart).
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 inner buckets
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else x[-1]
+        avg_y = y[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def lttb_series(s, n_out):
+    """LTTB on a Series; NaN stretches (indicator warm-up) are skipped."""
+    valid = s.dropna()
+    if len(valid) <= n_out:
+        return valid
+    return valid.iloc[lttb_indices(valid.to_numpy(dtype=float), n_out)]
+
+
+def prepare_chart_data(df, max_points=1500, lines=('sma_10', 'sma_50', 'ema_20', 'rsi', 'macd', 'macd_signal')):
+    """Downsampled candles/volume plus LTTB-decimated indicator lines for one indicator frame."""
+    return {
+        'candles': ohlc_downsample(df, max_points),
+        'lines': {c: lttb_series(df[c], max_points) for c in lines if c in df.columns},
+        'rows': len(df),
+    }
@@ -1,19 +1,215 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, bindparam
 from sqlalchemy.engine import URL
-from config import DB_URI
+from config import DB_URI, STORAGE_BACKEND, PARQUET_ROOT
+import io
+import time
 import pandas as pd
+import telemetry
+from storage import PriceStore, ParquetStore, PRICE_COLUMNS, NUMERIC_COLUMNS, to_utc
 
 engine = create_engine(DB_URI, pool_pre_ping=True)
 
-def write_prices(df, table="prices"):
-    # df must have: symbol, ts (ISO string), open, high, low, close, volume
-    df.to_sql(table, engine, if_exists="append", index=False, method='multi', chunksize=1000)
+# --- Postgres implementation (PostgresStore below wraps these) ---
+
+def _pg_write_prices(df, table="prices", chunk_rows=100_000):
+    """
+    Idempotent bulk load: each chunk is COPYed into a temp staging table and merged with
+    ON CONFLICT (symbol, ts) DO UPDATE, so re-running a download never duplicates rows.
+    df must have: symbol, ts (ISO string or datetime), open, high, low, close, volume [, source]
+    Returns {"rows", "inserted", "updated", "unchanged", "seconds", "rows_per_sec"}.
+    """
+    t0 = time.perf_counter()
+    stats = {"rows": 0, "inserted": 0, "updated": 0}
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {table}_stage (
+              symbol varchar(20), ts timestamptz, open numeric, high numeric, low numeric,
+              close numeric, volume numeric, source varchar(50)
+            ) ON COMMIT DELETE ROWS
+        """)
+        for start in range(0, len(df), chunk_rows):
+            part = df.iloc[start:start + chunk_rows].reindex(columns=PRICE_COLUMNS)
+            copy_frame(cur, part, f"{table}_stage", PRICE_COLUMNS)
+            # DISTINCT ON: a chunk may carry the same (symbol, ts) twice; keep the last one
+            cur.execute(f"""
+                INSERT INTO {table} (symbol, ts, open, high, low, close, volume, source)
+                SELECT DISTINCT ON (symbol, ts) symbol, ts, open, high, low, close, round(volume)::bigint, source
+                FROM (SELECT *, row_number() OVER () AS rn FROM {table}_stage) s
+                ORDER BY symbol, ts, rn DESC
+                ON CONFLICT (symbol, ts) DO UPDATE SET
+                  open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                  close = EXCLUDED.close, volume = EXCLUDED.volume, source = EXCLUDED.source
+                WHERE ({table}.open, {table}.high, {table}.low, {table}.close, {table}.volume, {table}.source)
+                  IS DISTINCT FROM (EXCLUDED.open, EXCLUDED.high, EXCLUDED.low, EXCLUDED.close, EXCLUDED.volume, EXCLUDED.source)
+                RETURNING (xmax = 0) AS inserted
+            """)
+            flags = [r[0] for r in cur.fetchall()]
+            stats["inserted"] += sum(flags)
+            stats["updated"] += len(flags) - sum(flags)
+            stats["rows"] += len(part)
+            raw.commit()  # one transaction per chunk keeps staging and WAL bounded
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    seconds = time.perf_counter() - t0
+    stats["unchanged"] = stats["rows"] - stats["inserted"] - stats["updated"]
+    stats["seconds"] = seconds
+    stats["rows_per_sec"] = stats["rows"] / seconds if seconds > 0 else float("nan")
+    return stats
+
+def _pg_read_range(symbols, start=None, end=None, columns=None, table="prices", con=None):
+    """
+    Rows for one or many symbols with start <= ts < end, ordered by (symbol, ts).
+    Filters and the column list are pushed into SQL (bound parameters, served by the
+    (symbol, ts) index); numeric columns come back as float instead of Decimal.
+    columns: subset of PRICE_COLUMNS; symbol and ts are always returned.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    columns = list(columns or ["open", "high", "low", "close", "volume"])
+    unknown = set(columns) - set(PRICE_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown price columns: {sorted(unknown)}")
+    cols = ["symbol", "ts"] + [c for c in columns if c not in ("symbol", "ts")]
+
+    where = ["symbol IN :symbols"]
+    params = {"symbols": list(symbols)}
+    if start is not None:
+        where.append("ts >= :start")
+        params["start"] = pd.Timestamp(start).to_pydatetime()
+    if end is not None:
+        where.append("ts < :end")
+        params["end"] = pd.Timestamp(end).to_pydatetime()
+    q = text(f"SELECT {', '.join(cols)} FROM {table} WHERE {' AND '.join(where)} ORDER BY symbol, ts")
+    q = q.bindparams(bindparam("symbols", expanding=True))
+    df = pd.read_sql(q, con if con is not None else engine, params=params)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    return df
+
+def _pg_iter_range(symbol, start=None, end=None, columns=("close",), chunk_rows=100_000, table="prices", con=None):
+    """
+    Stream one symbol's rows (start <= ts < end, ascending) as DataFrame chunks of up to
+    chunk_rows, through a server-side cursor, so the full range is never held in memory.
+    Only ts + the requested columns are selected; numeric columns are cast to double
+    precision in SQL (no per-value Decimal objects).
+    con: engine to use (default: the module engine).
+    """
+    columns = [c for c in columns if c != "ts"]
+    unknown = set(columns) - set(PRICE_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown price columns: {sorted(unknown)}")
+    select = ["ts"] + [f"CAST({c} AS double precision) AS {c}" if c in NUMERIC_COLUMNS else c for c in columns]
+    where = ["symbol = :sym"]
+    params = {"sym": symbol}
+    if start is not None:
+        where.append("ts >= :start")
+        params["start"] = pd.Timestamp(start).to_pydatetime()
+    if end is not None:
+        where.append("ts < :end")
+        params["end"] = pd.Timestamp(end).to_pydatetime()
+    q = text(f"SELECT {', '.join(select)} FROM {table} WHERE {' AND '.join(where)} ORDER BY ts")
+    with (con if con is not None else engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(q, params)
+        for part in result.partitions(chunk_rows):
+            df = pd.DataFrame(part, columns=["ts"] + columns)
+            df["ts"] = pd.to_datetime(df["ts"], utc=True)
+            yield df
+
+def _pg_max_ts(symbols, table="prices", con=None):
+    q = text(f"SELECT symbol, max(ts) AS ts FROM {table} WHERE symbol IN :symbols GROUP BY symbol")
+    q = q.bindparams(bindparam("symbols", expanding=True))
+    with (con if con is not None else engine).connect() as conn:
+        rows = conn.execute(q, {"symbols": list(symbols)}).fetchall()
+    return {sym: pd.Timestamp(ts) for sym, ts in rows if ts is not None}
+
+class PostgresStore(PriceStore):
+    def __init__(self, engine):
+        self.engine = engine
+
+    def read_range(self, symbols, start=None, end=None, columns=None):
+        return _pg_read_range(symbols, start, end, columns, con=self.engine)
+
+    def iter_range(self, symbol, start=None, end=None, columns=("close",), chunk_rows=100_000):
+        return _pg_iter_range(symbol, start, end, columns, chunk_rows, con=self.engine)
+
+    def write_prices(self, df):
+        return _pg_write_prices(df)
+
+    def max_ts(self, symbols):
+        return _pg_max_ts(symbols, con=self.engine)
+
+    def symbols(self):
+        with self.engine.connect() as conn:
+            return [r[0] for r in conn.execute(text("SELECT DISTINCT symbol FROM prices ORDER BY symbol"))]
+
+def make_store(backend=STORAGE_BACKEND, con=None):
+    """The price store for backend; con: engine for the Postgres store (default: the module engine)."""
+    if backend == "parquet":
+        return ParquetStore(PARQUET_ROOT)
+    if backend == "postgres":
+        return PostgresStore(con if con is not None else engine)
+    raise ValueError(f"unknown STORAGE_BACKEND: {backend}")
+
+# active price backend: every reader/writer below goes through it
+store = make_store()
+
+# --- public API (table/con arguments address a Postgres table directly, e.g. benchmarks) ---
+
+@telemetry.timed("write_prices", lambda s: {"rows": s["rows"], "inserted": s["inserted"], "updated": s["updated"]})
+def write_prices(df, table="prices", chunk_rows=100_000):
+    """
+    Idempotent bulk upsert on (symbol, ts) into the active store.
+    df must have: symbol, ts (ISO string or datetime), open, high, low, close, volume [, source]
+    Returns {"rows", "inserted", "updated", "unchanged", "seconds", "rows_per_sec"}.
+    """
+    if table != "prices":
+        return _pg_write_prices(df, table, chunk_rows)
+    return store.write_prices(df)
+
+@telemetry.timed("db_read", telemetry.frame_fields)
+def read_range(symbols, start=None, end=None, columns=None, table="prices", con=None):
+    """
+    Rows for one or many symbols with start <= ts < end, ordered by (symbol, ts).
+    columns: subset of PRICE_COLUMNS; symbol and ts are always returned; numeric columns are float.
+    """
+    if con is not None or table != "prices":
+        return _pg_read_range(symbols, start, end, columns, table, con)
+    return store.read_range(symbols, start, end, columns)
+
+def iter_range(symbol, start=None, end=None, columns=("close",), chunk_rows=100_000, table="prices", con=None):
+    """One symbol's ts + columns (start <= ts < end) as ascending chunks of up to chunk_rows rows."""
+    if con is not None or table != "prices":
+        return _pg_iter_range(symbol, start, end, columns, chunk_rows, table, con)
+    return store.iter_range(symbol, start, end, columns, chunk_rows)
 
 def read_prices(symbol, limit_days=365):
-    q = text("""
-        SELECT * FROM prices
-        WHERE symbol = :sym
-        ORDER BY ts DESC
-        LIMIT :limit
-    """)
-    return pd.read_sql(q.bindparams(sym=symbol, limit=limit_days*24*60), engine)
+    # filter by time instead of guessing a row count; newest first
+    since = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=limit_days)
+    df = read_range(symbol, start=since, columns=PRICE_COLUMNS)
+    return df.sort_values("ts", ascending=False).reset_index(drop=True)
+
+def read_prices_since(symbol, since=None):
+    """All rows for symbol with ts > since (or the full history), ascending, numeric columns as float."""
+    df = read_range(symbol, start=since)
+    if since is not None:
+        df = df[df["ts"] > to_utc(since)].reset_index(drop=True)
+    return df
+
+def max_ts(symbols, table="prices"):
+    """{symbol: latest stored ts} for the given symbols (missing symbols are omitted)."""
+    if table != "prices":
+        return _pg_max_ts(symbols, table)
+    return store.max_ts(symbols)
+
+def copy_frame(cursor, df, table, columns):
+    """Stream df[columns] into table with COPY FROM STDIN (psycopg2 cursor)."""
+    buf = io.StringIO()
+    df[columns].to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
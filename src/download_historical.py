@@ -49,21 +49,21 @@
 #         download_daily(sym)
 #         time.sleep(15)  # avoid rate limit (5 requests/min)
 
-import yfinance as yf
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-from sqlalchemy import create_engine
-from config import DB_URI
+from db import write_prices, max_ts
+from ratelimit import TokenBucket
 
-engine = create_engine(DB_URI)
+DEFAULT_START = "2015-01-01"
+CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "backfill_checkpoint.json")
 
-def save_stock(symbol):
-    print(f"Downloading {symbol}...")
-    df = yf.download(symbol, start="2015-01-01")
-
-    if df.empty:
-        print(f"⚠️ No data for {symbol}")
-        return
 
+def normalize_history(df, symbol):
+    """yfinance daily frame -> rows matching the prices table."""
     # ---- FIX: flatten multi-index column names ----
     df.columns = [col[0] if isinstance(col, tuple) else col for col in df.columns]
 
@@ -72,6 +72,7 @@ def save_stock(symbol):
     df['symbol'] = symbol
     df = df.rename(columns={
         "Date": "ts",
+        "Datetime": "ts",
         "Open": "open",
         "High": "high",
         "Low": "low",
@@ -82,13 +83,137 @@ def save_stock(symbol):
 
     # Keep only expected fields
     cols = ["ts", "symbol", "open", "high", "low", "close", "volume"]
-    df = df[cols]
+    return df[cols].assign(source="yfinance")
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+class YFinanceHistorySource:
+    def download(self, symbol, start, end=None):
+        import yfinance as yf
+        df = yf.download(symbol, start=start, end=end, progress=False)
+        if df.empty:
+            return df
+        return normalize_history(df, symbol)
+
+
+class FixtureHistorySource:
+    """Offline source: {symbol: DataFrame in prices-table layout}, filtered by [start, end)."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = []
+
+    def download(self, symbol, start, end=None):
+        self.calls.append((symbol, str(start)))
+        df = self.frames.get(symbol)
+        if df is None:
+            return pd.DataFrame()
+        ts = pd.to_datetime(df["ts"], utc=True)
+        mask = ts >= _utc(start)
+        if end is not None:
+            mask &= ts < _utc(end)
+        return df[mask].reset_index(drop=True)
+
+
+class Checkpoint:
+    """JSON file of finished symbols per job, so an interrupted backfill resumes where it stopped."""
+
+    def __init__(self, path=CHECKPOINT_PATH, job=None):
+        self.path = path
+        self.job = job or pd.Timestamp.now(tz="UTC").strftime("%Y-%m-%d")
+        self._lock = threading.Lock()
+        self.state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+        if self.state.get("job") != self.job:
+            self.state = {"job": self.job, "done": {}}
+
+    def is_done(self, symbol):
+        return symbol in self.state["done"]
+
+    def mark_done(self, symbol, summary):
+        with self._lock:
+            self.state["done"][symbol] = summary
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.state, f, default=str)
+            os.replace(tmp, self.path)
+
+
+def save_stock(symbol, start=DEFAULT_START, source=None, writer=write_prices):
+    print(f"Downloading {symbol}...")
+    df = (source or YFinanceHistorySource()).download(symbol, start)
+
+    if df.empty:
+        print(f"⚠️ No data for {symbol}")
+        return
+
+    # ---- Upsert into database (re-runs do not duplicate rows) ----
+    stats = writer(df)
+    print(f"✔ {symbol}: {stats['inserted']} inserted, {stats['updated']} updated, "
+          f"{stats['unchanged']} unchanged ({stats['rows_per_sec']:,.0f} rows/sec)")
+    return stats
+
+
+def backfill(symbols, source=None, writer=write_prices, last_ts_reader=max_ts, max_workers=4,
+             rate_per_sec=2.0, checkpoint=None, default_start=DEFAULT_START):
+    """
+    Incremental backfill: fetch only from each symbol's latest stored ts (the last day is
+    re-fetched and upserted, so late corrections land). Symbols run on a bounded thread
+    pool; every source call goes through a shared token bucket. Finished symbols are
+    recorded in the checkpoint and skipped when the same job is re-run.
+    Returns a per-symbol summary DataFrame.
+    """
+    source = source or YFinanceHistorySource()
+    checkpoint = checkpoint or Checkpoint()
+    bucket = TokenBucket(rate_per_sec, capacity=max(1.0, rate_per_sec))
+    todo = [s for s in symbols if not checkpoint.is_done(s)]
+    last = last_ts_reader(todo) if todo else {}
+
+    def run(symbol):
+        t0 = time.perf_counter()
+        start = last[symbol].strftime("%Y-%m-%d") if symbol in last else default_start
+        bucket.acquire()
+        df = source.download(symbol, start)
+        stats = writer(df) if df is not None and not df.empty else {"inserted": 0, "updated": 0}
+        return {
+            "symbol": symbol,
+            "start": start,
+            "fetched": 0 if df is None else len(df),
+            "inserted": stats["inserted"],
+            "updated": stats["updated"],
+            "seconds": round(time.perf_counter() - t0, 3),
+            "status": "ok",
+        }
+
+    rows = [dict(checkpoint.state["done"][s], status="skipped (checkpoint)") for s in symbols if s not in todo]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run, s): s for s in todo}
+        for fut in as_completed(futures):
+            sym = futures[fut]
+            try:
+                summary = fut.result()
+                checkpoint.mark_done(sym, summary)
+            except Exception as e:
+                summary = {"symbol": sym, "status": f"error: {e}"}
+            print(f"{'✔' if summary['status'] == 'ok' else '⚠️'} {sym}: {summary}")
+            rows.append(summary)
+
+    order = {s: i for i, s in enumerate(symbols)}
+    return pd.DataFrame(rows).sort_values("symbol", key=lambda c: c.map(order)).reset_index(drop=True)
 
-    # ---- Insert into database ----
-    df.to_sql("prices", engine, if_exists="append", index=False)
-    print(f"✔ Inserted {len(df)} rows for {symbol}")
 
 if __name__ == "__main__":
+    import sys
     symbols = ["AAPL", "MSFT", "GOOGL"]
-    for sym in symbols:
-        save_stock(sym)
+    if "--full" in sys.argv:
+        for sym in symbols:
+            save_stock(sym)
+    else:
+        print(backfill(symbols).to_string(index=False))
@@ -0,0 +1,12 @@
+# copy the Postgres prices table into the local Parquet store (PARQUET_ROOT)
+# usage: python src/export_parquet.py [SYMBOL ...]   (default: every symbol in the table)
+import sys
+from config import PARQUET_ROOT
+from db import PostgresStore, engine
+from storage import ParquetStore, copy_prices
+
+if __name__ == "__main__":
+    source = PostgresStore(engine)
+    dest = ParquetStore(PARQUET_ROOT)
+    rows = copy_prices(source, dest, sys.argv[1:] or None)
+    print(f"✅ {rows:,} rows exported to {PARQUET_ROOT}")
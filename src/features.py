@@ -0,0 +1,193 @@
+import os
+import pandas as pd
+
+# bump when any feature definition below changes; cached feature files are keyed by it
+FEATURE_VERSION = "v1"
+
+# columns the per-symbol LightGBM models are trained on (order matters: models use positional features)
+MODEL_FEATURES = ['return_1', 'ma_5', 'ma_20', 'up_ratio_14']
+# scale-free columns for the pooled (all-symbol) model, derived from FEATURES columns: price
+# levels differ across symbols, so moving averages enter as gaps to the close and the last
+# return also in units of the symbol's own volatility
+POOLED_FEATURES = ['return_1', 'return_z', 'ma_5_gap', 'ma_20_gap', 'up_ratio_14', 'vol_10']
+# columns exported to ml_features
+EXPORT_FEATURES = ['return_1', 'ma_5', 'ma_20', 'rsi_14', 'vol_10']
+
+SOURCE_COLUMNS = ['ts', 'symbol', 'open', 'high', 'low', 'close', 'volume']
+
+# rows of history needed to recompute every feature for newly appended rows.
+# rolling windows need <= 21 rows; rsi_14 is an EMA, whose weight after 500 rows is < 1e-16.
+LOOKBACK = 500
+# live bars needed to compute MODEL_FEATURES for the last one (ma_20 window + margin)
+MODEL_LOOKBACK = 30
+
+
+def _return_1(df):
+    return df['close'].pct_change()
+
+
+def _ma_5(df):
+    return df['close'].rolling(5).mean()
+
+
+def _ma_20(df):
+    return df['close'].rolling(20).mean()
+
+
+def _up_ratio_14(df):
+    # share of up-moves inside a 14-bar window: the old training "rsi_14" placeholder
+    # rolling(14).apply(lambda x: x.diff().gt(0).sum() / len(x)), without the per-window Python call
+    close = df['close']
+    up = (close.diff() > 0).astype(float)
+    full = close.notna().astype(float).rolling(14).sum() == 14
+    return (up.rolling(13).sum() / 14).where(full)
+
+
+def _rsi_14(df):
+    close = df['close']
+    diff = close.diff()
+    up = diff.where(diff > 0, 0.0).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    down = (-diff.where(diff < 0, 0.0)).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    rsi = 100 - 100 / (1 + up / down)
+    return rsi.where(down != 0, 100.0).where(down.notna())
+
+
+def _vol_10(df):
+    return df['close'].pct_change().rolling(10).std()
+
+
+FEATURES = {
+    'return_1': _return_1,
+    'ma_5': _ma_5,
+    'ma_20': _ma_20,
+    'up_ratio_14': _up_ratio_14,
+    'rsi_14': _rsi_14,
+    'vol_10': _vol_10,
+}
+
+
+def compute_features(df, names=MODEL_FEATURES):
+    """
+    Add the named feature columns to df (sorted by ts ascending, numeric close).
+    Modifies df in place and returns it; rows are not dropped.
+    """
+    for name in names:
+        df[name] = FEATURES[name](df)
+    return df
+
+
+def model_input(bars):
+    """MODEL_FEATURES row (1 x n) of the last of ts-ordered live bars; NaN until the windows fill."""
+    df = pd.DataFrame({'close': pd.to_numeric(bars['close'], errors='coerce').to_numpy(dtype=float)})
+    return compute_features(df, MODEL_FEATURES)[MODEL_FEATURES].to_numpy(dtype=float)[-1:]
+
+
+def compute_pooled_features(df):
+    """Add POOLED_FEATURES to df (sorted by ts ascending, numeric close); in place, returns df."""
+    compute_features(df, [n for n in ('return_1', 'ma_5', 'ma_20', 'up_ratio_14', 'vol_10') if n not in df.columns])
+    df['return_z'] = df['return_1'] / df['vol_10'].where(df['vol_10'] > 0)
+    df['ma_5_gap'] = df['close'] / df['ma_5'] - 1
+    df['ma_20_gap'] = df['close'] / df['ma_20'] - 1
+    return df
+
+
+def iter_features(chunks, names=MODEL_FEATURES, lookback=LOOKBACK):
+    """
+    Streaming compute_features: for source chunks in ts order, yield each chunk with the
+    named feature columns. The last `lookback` source rows of the previous chunk are
+    carried as warm-up, so windows spanning a chunk boundary match a single-pass compute.
+    """
+    tail = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        n_tail = 0 if tail is None else len(tail)
+        frame = chunk.reset_index(drop=True) if tail is None else pd.concat([tail, chunk], ignore_index=True)
+        tail = frame.iloc[-lookback:].copy()
+        compute_features(frame, names)
+        yield frame.iloc[n_tail:]
+
+
+def _same_row(a, b, columns):
+    return all(a[c] == b[c] or (pd.isna(a[c]) and pd.isna(b[c])) for c in columns)
+
+
+class FeatureCache:
+    """
+    Parquet cache of source rows + features, one file per (feature version, symbol).
+
+    get() only computes features for source rows newer than the last cached ts,
+    using the last LOOKBACK cached rows as warm-up history.
+    """
+
+    def __init__(self, root=None, names=None, version=FEATURE_VERSION):
+        base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "features")
+        self.root = root or base
+        self.names = list(names or FEATURES)
+        self.version = version
+
+    def path_for(self, symbol):
+        return os.path.join(self.root, self.version, f"{symbol.upper()}.parquet")
+
+    def load(self, symbol):
+        path = self.path_for(symbol)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def last_ts(self, symbol):
+        cached = self.load(symbol)
+        if cached is None or cached.empty:
+            return None
+        return cached['ts'].max()
+
+    def get(self, symbol, load_source):
+        """
+        load_source(symbol, since) -> source rows with ts > since (all rows when since is None).
+        Returns source + feature columns for the full history.
+        """
+        full = self.load(symbol)
+        cached, since = None, None
+        if full is not None and len(full) > 1:
+            # re-read the last cached bar as well: backfills and pollers upsert corrections to it
+            full = full.sort_values('ts').reset_index(drop=True)
+            cached, since = full.iloc[:-1], full['ts'].iloc[-2]
+        new = load_source(symbol, since)
+        if new is None or new.empty:
+            return full if full is not None else pd.DataFrame(columns=SOURCE_COLUMNS + self.names)
+
+        new = new.sort_values('ts').reset_index(drop=True)
+        if since is not None:
+            new = new[new['ts'] > since]
+            if new.empty:
+                return full
+
+        if since is None:
+            out = compute_features(new, self.names)
+        else:
+            src_cols = [c for c in new.columns if c in cached.columns and c not in self.names]
+            if len(new) == 1 and _same_row(new.iloc[0], full.iloc[-1], src_cols):
+                return full  # only the re-read bar came back, unchanged: nothing to write
+            warm = cached[src_cols].tail(LOOKBACK)
+            ctx = pd.concat([warm, new[src_cols]], ignore_index=True)
+            ctx = compute_features(ctx, self.names)
+            out = pd.concat([cached, ctx.iloc[len(warm):]], ignore_index=True)
+
+        path = self.path_for(symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write aside and swap in, so a concurrent reader never sees a half-written file
+        out.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        return out
+
+    def clear(self, symbol=None):
+        if symbol is not None:
+            path = self.path_for(symbol)
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        folder = os.path.join(self.root, self.version)
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                if name.endswith(".parquet"):
+                    os.remove(os.path.join(folder, name))
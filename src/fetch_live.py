@@ -1,16 +1,154 @@
-import yfinance as yf
+import os
+import time
+import threading
 import pandas as pd
+from src import telemetry
 
-def get_live_data(symbol):
-    df = yf.download(symbol, period="1d", interval="1m")
-    if df.empty:
-        return None
-    df = df.tail(1).reset_index()
-    df.rename(columns={
-        "Open": "open",
-        "High": "high",
-        "Low": "low",
-        "Close": "close",
-        "Volume": "volume"
-    }, inplace=True)
-    return df
+LIVE_COLUMNS = ["ts", "open", "high", "low", "close", "volume"]
+
+_RENAME = {
+    "Datetime": "ts",
+    "Date": "ts",
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+}
+
+
+class YFinanceSource:
+    """Default live source: one grouped yf.download call for many tickers."""
+
+    def __init__(self, period="1d", interval="1m"):
+        self.period = period
+        self.interval = interval
+
+    def download(self, symbols):
+        import yfinance as yf
+        return yf.download(
+            tickers=list(symbols),
+            period=self.period,
+            interval=self.interval,
+            group_by="ticker",
+            threads=True,
+            progress=False,
+        )
+
+
+class FixtureSource:
+    """
+    Offline source replaying recorded bars.
+    frames: {symbol: DataFrame with a datetime index and Open/High/Low/Close/Volume columns}
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = 0
+
+    @classmethod
+    def from_dir(cls, path):
+        # one recorded CSV per symbol: <SYMBOL>.csv, first column is the timestamp
+        frames = {}
+        for name in os.listdir(path):
+            if name.endswith(".csv"):
+                frames[name[:-4].upper()] = pd.read_csv(os.path.join(path, name), index_col=0, parse_dates=True)
+        return cls(frames)
+
+    def download(self, symbols):
+        self.calls += 1
+        found = {s: self.frames[s] for s in symbols if s in self.frames}
+        if not found:
+            return pd.DataFrame()
+        return pd.concat(found, axis=1)
+
+
+def split_by_symbol(raw, symbols, bars=1):
+    """Split a grouped download into {symbol: DataFrame of the last `bars` bars} with LIVE_COLUMNS."""
+    out = {}
+    if raw is None or raw.empty:
+        return {s: None for s in symbols}
+
+    if isinstance(raw.columns, pd.MultiIndex):
+        # yfinance may put the ticker on either level depending on group_by
+        level = 0 if set(symbols) & set(raw.columns.get_level_values(0)) else 1
+        present = set(raw.columns.get_level_values(level))
+    else:
+        level, present = None, set(symbols)
+
+    for sym in symbols:
+        if sym not in present:
+            out[sym] = None
+            continue
+        df = raw if level is None else raw.xs(sym, axis=1, level=level)
+        df = df.dropna(how="all")
+        if df.empty:
+            out[sym] = None
+            continue
+        df = df.tail(bars).reset_index()
+        df.columns = [str(c) for c in df.columns]
+        df = df.rename(columns=_RENAME)
+        if "ts" not in df.columns:
+            df = df.rename(columns={df.columns[0]: "ts"})
+        out[sym] = df.reindex(columns=LIVE_COLUMNS)
+    return out
+
+
+_default_source = None
+_cache = {}  # symbol -> (fetched_at, frame of the last bars or None, bars requested)
+_cache_lock = threading.Lock()
+
+
+def set_source(source):
+    """Swap the live data source (e.g. a FixtureSource for offline runs)."""
+    global _default_source
+    _default_source = source
+    clear_cache()
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def get_live_data_many(symbols, source=None, batch_size=100, ttl=5.0, bars=1):
+    """
+    Latest `bars` 1m bars for many symbols, fetched in grouped requests of batch_size.
+    Bars younger than ttl seconds are served from an in-process cache (if it holds enough bars).
+    Returns {symbol: DataFrame(ts, open, high, low, close, volume) or None}.
+    """
+    global _default_source
+    if source is None:
+        if _default_source is None:
+            _default_source = YFinanceSource()
+        source = _default_source
+
+    symbols = [s.upper() for s in symbols]
+    with telemetry.span("fetch_live", symbols=len(symbols)) as sp:
+        now = time.monotonic()
+        result = {}
+        missing = []
+        with _cache_lock:
+            for sym in dict.fromkeys(symbols):
+                hit = _cache.get(sym)
+                if hit is not None and now - hit[0] < ttl and hit[2] >= bars:
+                    result[sym] = hit[1] if hit[1] is None or hit[2] == bars else hit[1].tail(bars).reset_index(drop=True)
+                else:
+                    missing.append(sym)
+
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            frames = split_by_symbol(source.download(batch), batch, bars)
+            fetched_at = time.monotonic()
+            with _cache_lock:
+                for sym, df in frames.items():
+                    _cache[sym] = (fetched_at, df, bars)
+            result.update(frames)
+
+        sp.add(cache_hits=len(result) - len(missing), cache_misses=len(missing),
+               batches=-(-len(missing) // batch_size), rows=sum(len(df) for df in result.values() if df is not None))
+    return {sym: result[sym] for sym in symbols}
+
+
+def get_live_data(symbol, bars=1):
+    return get_live_data_many([symbol], bars=bars)[symbol.upper()]
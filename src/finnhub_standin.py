@@ -0,0 +1,157 @@
+# local stand-ins for the Finnhub endpoints the pollers and the tick stream use, so they can run without an API key or network
+# exercised by tests/test_finnhub_standin.py: AsyncPoller (update_intraday) against QuoteStandIn and
+# TickStream (stream_ticks) against TradeStandIn
+import json
+import time
+import random
+import asyncio
+import threading
+
+
+class QuoteStandIn:
+    """
+    Serves GET /quote?symbol=..&token=.. with Finnhub's JSON (c, h, l, o, pc, t) from a random
+    walk per symbol. Every `fail_every`-th request answers `fail_status` instead, and each
+    request waits `latency` seconds first, to exercise the poller's retries and concurrency.
+    """
+
+    def __init__(self, latency=0.0, fail_every=0, fail_status=429, seed=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.rng = random.Random(seed)
+        self.last = {}  # symbol -> last quote served
+        self.requests = 0
+        self.failures = 0
+        self._runner = None
+
+    async def quote(self, request):
+        from aiohttp import web
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not request.query.get("token"):
+            return web.json_response({"error": "Invalid API key"}, status=401)
+        if self.fail_every and self.requests % self.fail_every == 0:
+            self.failures += 1
+            return web.json_response({"error": "API limit reached"}, status=self.fail_status)
+        symbol = request.query.get("symbol", "").upper()
+        prev = self.last.get(symbol, {}).get("c", 100.0)
+        c = round(prev * (1 + self.rng.gauss(0, 0.002)), 4)
+        q = self.last[symbol] = {"c": c, "h": max(c, prev), "l": min(c, prev), "o": prev, "pc": prev, "t": int(time.time())}
+        return web.json_response(q)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving; returns the base_url to hand to AsyncPoller."""
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/quote", self.quote)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+class TradeStandIn:
+    """
+    WebSocket server speaking Finnhub's trade stream: after {"type": "subscribe", "symbol": ..}
+    messages it pushes {"type": "trade", "data": [{"s", "p", "v", "t"}, ..]} for the subscribed
+    symbols, stamped with the current time, plus an occasional {"type": "ping"}. Runs on its own
+    thread and event loop so the blocking websocket-client service can connect to it; every
+    connection is closed after `drop_after` messages to exercise reconnects.
+    """
+
+    def __init__(self, messages_per_sec=500, ticks_per_message=4, drop_after=0, seed=0):
+        self.messages_per_sec = messages_per_sec
+        self.ticks_per_message = ticks_per_message
+        self.drop_after = drop_after
+        self.rng = random.Random(seed)
+        self.prices = {}
+        self.sent_ticks = 0
+        self.connections = 0
+        self.streaming = threading.Event()
+        self._loop = None
+        self._stopped = None
+        self._thread = None
+
+    async def _handler(self, request):
+        from aiohttp import web, WSMsgType
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        subscribed = set()
+
+        async def read():
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                msg = json.loads(message.data)
+                if msg.get("type") == "subscribe":
+                    subscribed.add(msg["symbol"])
+
+        reader = asyncio.ensure_future(read())
+        try:
+            sent = 0
+            while not ws.closed and (not self.drop_after or sent < self.drop_after):
+                await asyncio.sleep(1 / self.messages_per_sec)
+                if not subscribed or not self.streaming.is_set():
+                    continue
+                now_ms = int(time.time() * 1000)
+                data = []
+                for sym in self.rng.choices(sorted(subscribed), k=self.ticks_per_message):
+                    p = self.prices[sym] = round(self.prices.get(sym, 100.0) * (1 + self.rng.gauss(0, 0.0005)), 4)
+                    data.append({"s": sym, "p": p, "v": 1, "t": now_ms})
+                # counted before the await, so once pause() returns no uncounted trade is in flight
+                self.sent_ticks += len(data)
+                await ws.send_str(json.dumps({"type": "trade", "data": data}))
+                sent += 1
+                if sent % 100 == 0:
+                    await ws.send_str(json.dumps({"type": "ping"}))
+        except Exception:
+            pass  # client went away
+        finally:
+            # stop reading first: with a receive pending, close() would drop the connection
+            # without waiting for the client's close frame (and unread trades with it)
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            await ws.close()
+        return ws
+
+    async def _serve(self, ready):
+        from aiohttp import web
+        self._loop = asyncio.get_running_loop()
+        self._stopped = self._loop.create_future()
+        app = web.Application()
+        app.router.add_get("/", self._handler)
+        runner = web.AppRunner(app, shutdown_timeout=1.0)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        self.port = runner.addresses[0][1]
+        ready.set()
+        try:
+            await self._stopped
+        finally:
+            await runner.cleanup()
+
+    def start(self):
+        """Start serving on a background thread; returns the ws:// url to hand to TickStream."""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve(ready)), daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        self.streaming.set()
+        return f"ws://127.0.0.1:{self.port}"
+
+    def pause(self):
+        """Stop pushing trades (connections stay open); sent_ticks is final when this returns."""
+        async def clear():
+            self.streaming.clear()  # on the server loop: no handler is between its check and its count
+        asyncio.run_coroutine_threadsafe(clear(), self._loop).result(10)
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stopped.set_result, None)
+        self._thread.join(10)
@@ -11,18 +11,33 @@ CREATE TABLE IF NOT EXISTS prices (
   low numeric,
   close numeric,
   volume bigint,
-  source varchar(50)
+  source varchar(50),
+  CONSTRAINT prices_symbol_ts_key UNIQUE (symbol, ts)
 );
 
+-- existing databases: drop duplicate (symbol, ts) rows, then add the unique key used by write_prices
+DELETE FROM prices a USING prices b
+  WHERE a.symbol = b.symbol AND a.ts = b.ts AND a.id > b.id;
+CREATE UNIQUE INDEX IF NOT EXISTS prices_symbol_ts_key ON prices (symbol, ts);
+-- the unique (symbol, ts) index above serves every per-symbol range read (db.read_range);
+-- BRIN keeps time-only scans over large, append-ordered history cheap at a few pages of index
+CREATE INDEX IF NOT EXISTS prices_ts_brin ON prices USING brin (ts);
+
 CREATE TABLE IF NOT EXISTS ml_features (
   id serial PRIMARY KEY,
   symbol varchar(20),
   ts timestamptz,
   feature_json jsonb,
   target numeric,
-  model_label varchar(20)
+  model_label varchar(20),
+  feature_version varchar(20)
 );
 
+-- existing databases: add the version column and make (symbol, ts, feature_version) unique
+ALTER TABLE ml_features ADD COLUMN IF NOT EXISTS feature_version varchar(20);
+CREATE UNIQUE INDEX IF NOT EXISTS ml_features_symbol_ts_version_key
+  ON ml_features (symbol, ts, feature_version);
+
 CREATE TABLE IF NOT EXISTS realtime_signals (
   id serial PRIMARY KEY,
   symbol varchar(20),
@@ -33,6 +48,8 @@ CREATE TABLE IF NOT EXISTS realtime_signals (
   expected_return numeric,
   model_name varchar(50)
 );
+-- latest signal per symbol (DISTINCT ON (symbol) ... ORDER BY symbol, ts DESC) is an index scan
+CREATE INDEX IF NOT EXISTS realtime_signals_symbol_ts_idx ON realtime_signals (symbol, ts DESC);
 """
 
 if __name__ == "__main__":
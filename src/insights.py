@@ -2,7 +2,12 @@
 import pandas as pd
 import numpy as np
 import ta  # pip install ta
+try:
+    from src import telemetry
+except ImportError:  # run from inside src/
+    import telemetry
 
+@telemetry.timed("fetch_and_prepare", telemetry.frame_fields)
 def fetch_and_prepare(df):
     """
     Normalize dataframe:
@@ -71,9 +76,12 @@ def fetch_and_prepare(df):
 
     return df
 
+@telemetry.timed("add_indicators", telemetry.frame_fields)
 def add_indicators(df):
     """
     Add technical indicators. Expects df with 1-D numeric 'close' series.
+    Batch entry point; for bar-by-bar updates use streaming_indicators.IndicatorEngine,
+    which produces the same columns in O(1) per bar.
     """
     df = df.copy()
 
@@ -106,7 +114,7 @@ def add_indicators(df):
         df['rsi'] = np.nan
 
     # MACD
-    macd_obj = ta.trend.MACD(close=df['close'].fillna(method='ffill'), window_slow=26, window_fast=12, window_sign=9)
+    macd_obj = ta.trend.MACD(close=df['close'].ffill(), window_slow=26, window_fast=12, window_sign=9)
     df['macd'] = macd_obj.macd()
     df['macd_signal'] = macd_obj.macd_signal()
 
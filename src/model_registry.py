@@ -0,0 +1,156 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "..", "models")
+# the pooled (all-symbol) model: models/_POOLED_lgbm.{txt,pkl,json}, see src/pooled_model.py
+POOLED_SYMBOL = "_POOLED"
+
+
+def load_model_file(path):
+    """Native LightGBM text models load without sklearn/joblib; pickles are the fallback."""
+    if path.endswith(".txt"):
+        from src.native_model import NativeModel, BoosterModel
+        try:
+            return NativeModel.load(path)
+        except ValueError:
+            # categorical splits (train_pooled(categorical=True)): evaluate with lightgbm itself
+            return BoosterModel.load(path)
+    import joblib
+    return joblib.load(path)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    """
+    In-process cache of trained models keyed by symbol.
+
+    - each model is loaded once and kept in an LRU; models/<SYMBOL>_lgbm.txt (native
+      LightGBM format) is preferred over models/<SYMBOL>_lgbm.pkl when both exist
+    - total size (estimated from the model file size on disk) is capped by max_bytes
+    - a file is reloaded when its mtime/size changes and its content hash differs
+    - pooled: how the pooled model (train_model.train_pooled) is used, default from
+      POOLED_MODEL: "fallback" serves it to symbols without their own model, "prefer" serves
+      it to every symbol, "off" ignores it. It is loaded once and handed out as per-symbol views.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, max_bytes=256 * 1024 * 1024, loader=load_model_file, prefer_native=True,
+                 pooled=None):
+        self.model_dir = model_dir
+        self.prefer_native = prefer_native
+        self.pooled = pooled or os.environ.get("POOLED_MODEL", "fallback")
+        if self.pooled not in ("fallback", "prefer", "off"):
+            raise ValueError(f"unknown pooled mode: {self.pooled}")
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries = OrderedDict()  # symbol -> dict(model, path, mtime_ns, size, digest)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def path_for(self, symbol):
+        base = os.path.join(self.model_dir, f"{symbol.upper()}_lgbm")
+        if self.prefer_native and os.path.exists(base + ".txt"):
+            return base + ".txt"
+        return base + ".pkl"
+
+    def get(self, symbol):
+        """Return the model for symbol (its own or a view of the pooled model), or None if there is none."""
+        symbol = symbol.upper()
+        order = {"fallback": (symbol, POOLED_SYMBOL), "prefer": (POOLED_SYMBOL, symbol), "off": (symbol,)}[self.pooled]
+        for key in order:
+            model = self._get(key)
+            if model is not None:
+                return model.for_symbol(symbol) if key == POOLED_SYMBOL else model
+        return None
+
+    def _get(self, symbol):
+        path = self.path_for(symbol)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._evict(symbol)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and entry["path"] != path:
+                # a native model appeared (or disappeared) next to the pickle
+                self.reloads += 1
+                self._evict(symbol)
+                entry = None
+            if entry is not None:
+                if entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                    self._entries.move_to_end(symbol)
+                    self.hits += 1
+                    return entry["model"]
+                # file was touched: only reload when the content really changed
+                digest = file_digest(path)
+                if digest == entry["digest"]:
+                    entry["mtime_ns"] = st.st_mtime_ns
+                    self._entries.move_to_end(symbol)
+                    self.hits += 1
+                    return entry["model"]
+                self.reloads += 1
+                self._evict(symbol)
+            else:
+                digest = file_digest(path)
+
+            self.misses += 1
+            if symbol == POOLED_SYMBOL:
+                from src.pooled_model import PooledModel
+                model = PooledModel.load(path, self.loader)
+            else:
+                model = self.loader(path)
+            self._entries[symbol] = {
+                "model": model,
+                "path": path,
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                "digest": digest,
+            }
+            self._shrink()
+            return model
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._evict(symbol.upper())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models": len(self._entries),
+                "bytes": self._total_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+            }
+
+    def _evict(self, symbol):
+        self._entries.pop(symbol, None)
+
+    def _total_bytes(self):
+        return sum(e["size"] for e in self._entries.values())
+
+    def _shrink(self):
+        # always keep the most recently used model, even if it alone exceeds the cap
+        while len(self._entries) > 1 and self._total_bytes() > self.max_bytes:
+            self._entries.popitem(last=False)
+
+
+# process-wide default registry
+registry = ModelRegistry()
@@ -0,0 +1,188 @@
+"""
+Inference-only reader for LightGBM's native text model format (models/<SYMBOL>_lgbm.txt).
+
+Loading a pickled LGBMClassifier imports lightgbm, which in turn imports scikit-learn,
+and then unpickles the estimator; together that dominates a cold start. NativeModel parses
+the text dump and evaluates the trees with NumPy, so it needs neither of them and exposes
+the small part of the classifier API that predict_realtime uses.
+Only numerical splits and the binary objective are supported (what train_model produces).
+"""
+import os
+import numpy as np
+
+K_ZERO_THRESHOLD = 1e-35
+
+
+class _Tree:
+    __slots__ = ("split_feature", "threshold", "decision_type", "left", "right", "leaf_value", "_nodes")
+
+    def __init__(self, fields):
+        self.leaf_value = np.array(fields["leaf_value"].split(), dtype=float)
+        if int(fields["num_leaves"]) > 1:
+            self.split_feature = np.array(fields["split_feature"].split(), dtype=int)
+            self.threshold = np.array(fields["threshold"].split(), dtype=float)
+            self.decision_type = np.array(fields["decision_type"].split(), dtype=int)
+            self.left = np.array(fields["left_child"].split(), dtype=int)
+            self.right = np.array(fields["right_child"].split(), dtype=int)
+            if (self.decision_type & 1).any():
+                raise ValueError("categorical splits are not supported by NativeModel")
+            # plain-list copy of the nodes for the scalar path (numpy scalar indexing is slow)
+            self._nodes = list(zip(self.split_feature.tolist(), self.threshold.tolist(),
+                                   self.decision_type.tolist(), self.left.tolist(), self.right.tolist()))
+        else:
+            self.split_feature = None
+
+    def predict_row(self, row):
+        # scalar walk: cheaper than the vectorized path for the 1-row live prediction
+        if self.split_feature is None:
+            return float(self.leaf_value[0])
+        nodes = self._nodes
+        node = 0
+        while node >= 0:
+            feature, threshold, dt, left, right = nodes[node]
+            x = row[feature]
+            missing = (dt >> 2) & 3
+            if x != x and missing != 2:
+                x = 0.0
+            if (missing == 1 and -K_ZERO_THRESHOLD <= x <= K_ZERO_THRESHOLD) or (missing == 2 and x != x):
+                go_left = bool(dt & 2)
+            else:
+                go_left = x <= threshold
+            node = left if go_left else right
+        return float(self.leaf_value[~node])
+
+    def predict(self, X):
+        n = X.shape[0]
+        if self.split_feature is None:
+            return np.full(n, self.leaf_value[0])
+        node = np.zeros(n, dtype=int)
+        leaf = np.zeros(n, dtype=int)
+        active = np.arange(n)
+        while active.size:
+            nd = node[active]
+            x = X[active, self.split_feature[nd]]
+            dt = self.decision_type[nd]
+            missing = (dt >> 2) & 3  # 0: none, 1: zero, 2: NaN
+            isnan = np.isnan(x)
+            x = np.where(isnan & (missing != 2), 0.0, x)
+            use_default = ((missing == 1) & (np.abs(x) <= K_ZERO_THRESHOLD)) | ((missing == 2) & isnan)
+            go_left = np.where(use_default, (dt & 2) > 0, x <= self.threshold[nd])
+            child = np.where(go_left, self.left[nd], self.right[nd])
+            done = child < 0
+            leaf[active[done]] = ~child[done]
+            node[active[~done]] = child[~done]
+            active = active[~done]
+        return self.leaf_value[leaf]
+
+
+class NativeModel:
+    """Binary LightGBM model evaluated from its text dump; mirrors LGBMClassifier's predict API."""
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, trees, sigmoid=1.0, feature_names=None, n_features=0):
+        self.trees = trees
+        self.sigmoid = sigmoid
+        self.feature_names = feature_names or []
+        self.n_features_in_ = n_features
+
+    @classmethod
+    def load(cls, path):
+        header, trees, fields = {}, [], None
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line == "end of trees":
+                    break
+                if line.startswith("Tree="):
+                    fields = {}
+                    trees.append(fields)
+                elif "=" in line:
+                    key, value = line.split("=", 1)
+                    (fields if fields is not None else header)[key] = value
+
+        objective = header.get("objective", "binary").split()
+        if objective[0] != "binary":
+            raise ValueError(f"NativeModel only supports the binary objective, got {objective[0]}")
+        sigmoid = 1.0
+        for part in objective[1:]:
+            if part.startswith("sigmoid:"):
+                sigmoid = float(part.split(":", 1)[1])
+        return cls(
+            [_Tree(t) for t in trees],
+            sigmoid=sigmoid,
+            feature_names=header.get("feature_names", "").split(),
+            n_features=int(header.get("max_feature_idx", -1)) + 1,
+        )
+
+    def raw_score(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[0] <= 4:
+            rows = X.tolist()
+            return np.array([sum(tree.predict_row(row) for tree in self.trees) for row in rows])
+        score = np.zeros(X.shape[0])
+        for tree in self.trees:
+            score += tree.predict(X)
+        return score
+
+    def predict_proba(self, X):
+        p = 1.0 / (1.0 + np.exp(-self.sigmoid * self.raw_score(X)))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    @property
+    def feature_importances_(self):
+        # split counts, same as LGBMClassifier's default importance_type="split"
+        counts = np.zeros(self.n_features_in_, dtype=int)
+        for tree in self.trees:
+            if tree.split_feature is not None:
+                np.add.at(counts, tree.split_feature, 1)
+        return counts
+
+
+class BoosterModel:
+    """The same predict API around lightgbm's Booster, for text models NativeModel cannot evaluate (categorical splits)."""
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, booster):
+        self.booster_ = booster
+        self.n_features_in_ = booster.num_feature()
+
+    @classmethod
+    def load(cls, path):
+        import lightgbm as lgb
+        return cls(lgb.Booster(model_file=path))
+
+    def predict_proba(self, X):
+        p = self.booster_.predict(np.asarray(X, dtype=float))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+    @property
+    def feature_importances_(self):
+        return self.booster_.feature_importance()
+
+
+def save_native(model, path):
+    """Write the booster of a fitted LGBMClassifier (or a Booster) as a LightGBM text model."""
+    booster = getattr(model, "booster_", model)
+    booster.save_model(path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+if __name__ == "__main__":
+    # convert every models/*_lgbm.pkl into models/*_lgbm.txt
+    import glob
+    import joblib
+    model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models")
+    for pkl in sorted(glob.glob(os.path.join(model_dir, "*_lgbm.pkl"))):
+        txt = pkl[:-len(".pkl")] + ".txt"
+        save_native(joblib.load(pkl), txt)
+        print(f"✔ {os.path.basename(pkl)} -> {os.path.basename(txt)}")
@@ -0,0 +1,78 @@
+# src/pooled_model.py
+"""
+One LightGBM model for the whole universe (train_model.train_pooled), served per symbol.
+
+The pooled model is fit on a stacked panel of all symbols with scale-free features
+(features.POOLED_FEATURES) and, optionally, the symbol as a categorical column. The
+ModelRegistry loads it once (models/_POOLED_lgbm.*) and hands out PooledSymbolModel views
+with the predict_proba that predict_realtime uses. A view computes the pooled features
+itself from a short window of live bars (`lookback` rows with a close column), so symbols
+without a model of their own, e.g. new listings, are scored as well.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+
+try:
+    from src.features import POOLED_FEATURES, compute_pooled_features
+except ImportError:
+    from features import POOLED_FEATURES, compute_pooled_features
+
+LOOKBACK = 30  # bars of close history the pooled features need (ma_20 and vol_10 windows + margin)
+
+
+class PooledModel:
+    def __init__(self, model, meta=None, name=None):
+        meta = meta or {}
+        self.model = model
+        self.features = list(meta.get("features", POOLED_FEATURES))
+        self.codes = {sym: i for i, sym in enumerate(meta.get("symbols", []))}
+        self.lookback = int(meta.get("lookback", LOOKBACK))
+        self.name = name
+        self.classes_ = np.asarray(getattr(model, "classes_", [0, 1]))
+        self._views = {}
+
+    @classmethod
+    def load(cls, path, loader):
+        """Model file via the registry's loader, training metadata from the json next to it."""
+        meta = {}
+        meta_path = os.path.splitext(path)[0] + ".json"
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        return cls(loader(path), meta, os.path.basename(path))
+
+    def for_symbol(self, symbol):
+        view = self._views.get(symbol)
+        if view is None:
+            view = self._views[symbol] = PooledSymbolModel(self, symbol)
+        return view
+
+    def feature_matrix(self, symbol, bars):
+        """Pooled feature rows for ts-ordered bars (a frame with a close column)."""
+        df = pd.DataFrame({"close": pd.to_numeric(bars["close"], errors="coerce").to_numpy(dtype=float)})
+        df = compute_pooled_features(df)
+        if "symbol_code" in self.features:
+            # unseen symbols get a missing category
+            df["symbol_code"] = self.codes.get(symbol, np.nan)
+        return df[self.features].to_numpy(dtype=float)
+
+    def predict_last(self, frames):
+        """{symbol: bars} -> class probabilities of each symbol's last bar, in one model call."""
+        X = np.vstack([self.feature_matrix(sym, bars)[-1:] for sym, bars in frames.items()])
+        return self.model.predict_proba(X)
+
+
+class PooledSymbolModel:
+    """The pooled model as seen by one symbol: one probability row per input bar."""
+
+    def __init__(self, pooled, symbol):
+        self.pooled = pooled
+        self.symbol = symbol
+        self.classes_ = pooled.classes_
+        self.lookback = pooled.lookback
+        self.model_name = pooled.name
+
+    def predict_proba(self, bars):
+        return self.pooled.model.predict_proba(self.pooled.feature_matrix(self.symbol, bars))
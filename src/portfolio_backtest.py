@@ -0,0 +1,153 @@
+import os
+import glob
+import time
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from backtest import FEATURES, load_backtest_frame, strategy_returns, backtest_grid
+from model_registry import POOLED_SYMBOL
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models")
+
+
+def discover_symbols(model_dir=MODEL_DIR):
+    """Symbols that have a models/<SYMBOL>_lgbm.txt (the pooled model is not a symbol)."""
+    paths = glob.glob(os.path.join(model_dir, "*_lgbm.txt"))
+    return sorted({os.path.basename(p)[:-len("_lgbm.txt")] for p in paths} - {POOLED_SYMBOL})
+
+
+def _init_worker():
+    # forked workers must not share the parent's pooled DB connections
+    try:
+        from db import engine
+        engine.dispose(close=False)
+    except Exception:
+        pass
+
+
+def run_symbol(symbol, model_dir=MODEL_DIR, threshold=0.6, holding_period=1, cost=0.0, frame_loader=load_backtest_frame):
+    """Backtest one symbol: load its price slice and model once, return per-bar returns + stats + timings."""
+    timings = {}
+    t0 = time.perf_counter()
+    df = frame_loader(symbol)
+    timings["load_data"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    model = lgb.Booster(model_file=os.path.join(model_dir, f"{symbol}_lgbm.txt"))
+    timings["load_model"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    probs = model.predict(df[FEATURES].values) if len(df) else np.array([])
+    timings["predict"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    per_bar, held = strategy_returns(df, probs, threshold, holding_period, cost)
+    stats = backtest_grid(df, probs, (threshold,), (holding_period,), (cost,)).to_dict("records")[0]
+    timings["backtest"] = time.perf_counter() - t0
+
+    returns = pd.Series(per_bar, index=pd.to_datetime(df["ts"], utc=True), name=symbol)
+    positions = pd.Series(held.astype(np.int8), index=returns.index, name=symbol)
+    return {
+        "symbol": symbol,
+        "returns": returns,
+        "positions": positions,
+        "stats": stats,
+        "rows": len(df),
+        "timings": timings,
+        "pid": os.getpid(),
+    }
+
+
+def combine(results, sizing="equal", fraction=0.1):
+    """
+    Aggregate per-symbol per-bar returns (aligned on ts) into portfolio returns.
+
+    sizing:
+      - "equal":  capital split equally across all symbols (weight 1/N)
+      - "fixed":  every open trade gets `fraction` of equity
+      - "active": capital split equally across symbols with an open trade on that bar
+    """
+    symbols = sorted(results)
+    if not symbols:
+        return pd.Series(dtype=float)
+    rets = pd.concat([results[s]["returns"] for s in symbols], axis=1).sort_index().fillna(0.0)
+    pos = pd.concat([results[s]["positions"] for s in symbols], axis=1).sort_index().fillna(0)
+
+    if sizing == "equal":
+        port = rets.sum(axis=1) / len(symbols)
+    elif sizing == "fixed":
+        port = rets.sum(axis=1) * fraction
+    elif sizing == "active":
+        n_active = pos.sum(axis=1)
+        port = (rets.sum(axis=1) / n_active.where(n_active > 0)).fillna(0.0)
+    else:
+        raise ValueError(f"unknown sizing: {sizing}")
+    return port.rename("portfolio_return")
+
+
+def portfolio_backtest(symbols=None, model_dir=MODEL_DIR, threshold=0.6, holding_period=1, cost=0.0,
+                       sizing="equal", fraction=0.1, max_workers=None, frame_loader=load_backtest_frame,
+                       periods_per_year=252, verbose=True):
+    """
+    Backtest many symbols on a process pool and aggregate into a portfolio.
+    Output does not depend on max_workers: results are combined in sorted symbol order.
+    Returns (equity Series, per-symbol DataFrame, report dict).
+    """
+    symbols = sorted(symbols or discover_symbols(model_dir))
+    max_workers = max_workers or min(len(symbols), os.cpu_count() or 1) or 1
+    kwargs = dict(model_dir=model_dir, threshold=threshold, holding_period=holding_period,
+                  cost=cost, frame_loader=frame_loader)
+
+    t_start = time.perf_counter()
+    results = {}
+    if max_workers == 1:
+        for i, sym in enumerate(symbols, 1):
+            results[sym] = run_symbol(sym, **kwargs)
+            if verbose:
+                print(f"[{i}/{len(symbols)}] {sym} done")
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(run_symbol, sym, **kwargs): sym for sym in symbols}
+            for i, fut in enumerate(as_completed(futures), 1):
+                sym = futures[fut]
+                results[sym] = fut.result()
+                if verbose:
+                    elapsed = time.perf_counter() - t_start
+                    print(f"[{i}/{len(symbols)}] {sym} done ({elapsed:.1f}s elapsed)")
+    wall = time.perf_counter() - t_start
+
+    port = combine(results, sizing=sizing, fraction=fraction)
+    equity = (1 + port).cumprod().rename("equity")
+
+    per_symbol = pd.DataFrame([
+        {"symbol": s, "rows": results[s]["rows"], "pid": results[s]["pid"],
+         **results[s]["stats"], **{f"t_{k}": v for k, v in results[s]["timings"].items()}}
+        for s in symbols
+    ])
+
+    n = len(port)
+    total_return = equity.iloc[-1] - 1 if n else 0.0
+    std = port.std(ddof=0) if n else 0.0
+    task_seconds = float(per_symbol.filter(regex="^t_").sum().sum()) if len(per_symbol) else 0.0
+    report = {
+        "symbols": len(symbols),
+        "workers": max_workers,
+        "sizing": sizing,
+        "total_return": total_return,
+        "sharpe": port.mean() / std * np.sqrt(periods_per_year) if std > 0 else np.nan,
+        # drawdown measured from the initial capital of 1.0
+        "max_drawdown": min((equity / equity.cummax().clip(lower=1.0) - 1).min(), 0.0) if n else 0.0,
+        "wall_seconds": wall,
+        "task_seconds": task_seconds,
+        "parallel_efficiency": task_seconds / (wall * max_workers) if wall > 0 else np.nan,
+    }
+    if verbose:
+        print(per_symbol.to_string(index=False))
+        for k, v in report.items():
+            print(f"{k}: {v}")
+    return equity, per_symbol, report
+
+
+if __name__ == "__main__":
+    portfolio_backtest(threshold=0.6, holding_period=1, cost=0.0005, sizing="equal")
@@ -1,34 +1,108 @@
-import os
-import joblib
-from src.fetch_live import get_live_data
+import time
+import numpy as np
+from src.fetch_live import get_live_data, get_live_data_many
+from src.model_registry import registry
+from src.pooled_model import PooledSymbolModel, LOOKBACK as POOLED_LOOKBACK
+from src.features import MODEL_LOOKBACK, model_input
+from src import telemetry
+
+# live bars fetched per symbol: per-symbol models (MODEL_FEATURES) and the pooled model
+# compute their features from a short close history
+LIVE_BARS = max(MODEL_LOOKBACK, POOLED_LOOKBACK)
+
+
+def _label(model, proba):
+    """Map a predict_proba row (or matrix) to BUY/SELL + confidence without a second predict() call."""
+    proba = np.atleast_2d(proba)
+    idx = proba.argmax(axis=1)
+    classes = np.asarray(getattr(model, "classes_", np.arange(proba.shape[1])))
+    actions = np.where(classes[idx] == 1, "BUY", "SELL")
+    confidences = proba.max(axis=1).round(3)
+    return actions, confidences
 
 
 def predict_live(symbol: str):
     """Load live data + model and return BUY/SELL + confidence"""
 
     # 1) Fetch live price
-    df = get_live_data(symbol)
+    df = get_live_data(symbol, bars=LIVE_BARS)
     if df is None or df.empty:
         return None, None
 
-    # 2) Build model path. (_lgbm.pkl instead of plain .pkl)
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    model_filename = f"{symbol.upper()}_lgbm.pkl"
-    model_path = os.path.join(BASE_DIR, "..", "models", model_filename)
-
-    if not os.path.exists(model_path):
+    # 2) Get trained model from the in-process registry (_lgbm.txt or .pkl, loaded once)
+    with telemetry.span("model_load", symbol=symbol):
+        model = registry.get(symbol)
+    if model is None:
         return f"❌ Model not found for {symbol}", None
 
-    # 3) Load trained model
-    model = joblib.load(model_path)
+    # features of the last bar; a pooled model view computes its own from the close history
+    if isinstance(model, PooledSymbolModel):
+        X = df.tail(model.lookback)
+    else:
+        X = model_input(df)
+        if np.isnan(X).any():
+            return None, None  # not enough bars yet for the feature windows
+
+    # 3) Predict (single predict_proba call gives both label and confidence)
+    with telemetry.span("inference", symbol=symbol, rows=len(X)):
+        actions, confidences = _label(model, model.predict_proba(X))
+
+    return str(actions[-1]), float(confidences[-1])
+
+
+def predict_many(symbols):
+    """
+    Score many symbols in one pass.
+    Returns ({symbol: (action, confidence)}, {stage: seconds}).
+    """
+    timings = {}
+    results = {}
 
-    features = ["close", "volume", "high", "low"]
-    df = df.tail(1)  # last row only (most recent)
+    # 1) Fetch live bars (grouped download)
+    t0 = time.perf_counter()
+    live = get_live_data_many(symbols, bars=LIVE_BARS)
+    present = []
+    for sym in symbols:
+        df = live[sym.upper()]
+        if df is None or df.empty:
+            results[sym] = (None, None)
+        else:
+            present.append(sym)
+    timings["fetch"] = time.perf_counter() - t0
 
-    # 4) Predict
-    prediction = model.predict(df[features])[0]
-    confidence = max(model.predict_proba(df[features])[0])
+    # 2) Resolve models (cached after first load)
+    t0 = time.perf_counter()
+    models = {}
+    for sym in present:
+        model = registry.get(sym)
+        if model is None:
+            results[sym] = (f"❌ Model not found for {sym}", None)
+        else:
+            models[sym] = model
+    timings["load"] = time.perf_counter() - t0
 
-    action = "BUY" if prediction == 1 else "SELL"
+    # 3) Predict: MODEL_FEATURES of every own-model symbol's last bar in one matrix, one
+    #    predict_proba per model over its row; symbols served by the pooled model share one
+    #    call over their last bars
+    t0 = time.perf_counter()
+    own = {sym: m for sym, m in models.items() if not isinstance(m, PooledSymbolModel)}
+    if own:
+        X = np.vstack([model_input(live[sym.upper()]) for sym in own])
+        for i, (sym, model) in enumerate(own.items()):
+            if np.isnan(X[i]).any():
+                results[sym] = (None, None)  # not enough bars yet for the feature windows
+                continue
+            actions, confidences = _label(model, model.predict_proba(X[i:i + 1]))
+            results[sym] = (str(actions[0]), float(confidences[0]))
+    pooled = {}
+    for sym, model in models.items():
+        if isinstance(model, PooledSymbolModel):
+            pooled.setdefault(id(model.pooled), (model.pooled, {}))[1][sym] = live[sym.upper()].tail(model.lookback)
+    for parent, frames in pooled.values():
+        actions, confidences = _label(parent, parent.predict_last(frames))
+        for sym, action, confidence in zip(frames, actions, confidences):
+            results[sym] = (str(action), float(confidence))
+    timings["predict"] = time.perf_counter() - t0
+    timings["total"] = timings["fetch"] + timings["load"] + timings["predict"]
 
-    return action, round(confidence, 3)
+    return {sym: results[sym] for sym in symbols if sym in results}, timings
@@ -0,0 +1,122 @@
+# src/price_cache.py
+"""
+Delta-fetch cache for the dashboard's price windows.
+
+Each symbol's already-loaded rows are kept in memory. A request for the last `days`
+only queries what is missing:
+- rows from the last cached ts on (the common case: a few new bars, or none); the last
+  bar is re-read because pollers and backfills upsert corrections to it, and re-read rows
+  replace the cached copies
+- rows older than the first cached ts when a longer window is asked for
+Rows older than the longest window asked for so far are dropped, so a long-running
+dashboard keeps a window that moves with time instead of growing.
+Queries are rate-limited per symbol by `refresh_every` seconds; within that interval the
+cached window is returned without touching the store.
+Both queries are PriceStore.read_range calls, so the cache works on whichever backend
+db.make_store picks (STORAGE_BACKEND): the prices table or the local Parquet store.
+"""
+import time
+import threading
+import pandas as pd
+from src import telemetry
+
+COLUMNS = ["ts", "open", "high", "low", "close", "volume"]
+
+
+class PriceWindowCache:
+    def __init__(self, store, refresh_every=5.0, clock=time.monotonic):
+        self.store = store
+        self.refresh_every = refresh_every
+        self.clock = clock
+        self._frames = {}      # symbol -> DataFrame indexed by ts (UTC)
+        self._start = {}       # symbol -> earliest `since` already covered
+        self._days = {}        # symbol -> longest window (days) asked for; older rows are dropped
+        self._checked = {}     # symbol -> clock() of the last delta query
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0          # served from memory, no query
+        self.deltas = 0        # only rows from the last cached bar on queried
+        self.misses = 0        # full window (or an older gap) queried
+        self.rows_fetched = 0
+        self.query_seconds = 0.0
+        self.last_query_seconds = 0.0
+
+    def _symbol_lock(self, symbol):
+        with self._lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _query(self, symbol, since, before=None):
+        """symbol's rows with since <= ts < before (no upper bound when before is None)."""
+        t0 = time.perf_counter()
+        with telemetry.span("db_read", symbol=symbol) as sp:
+            df = self.store.read_range(symbol, since, before, columns=COLUMNS[1:])
+            sp.add(**telemetry.frame_fields(df))
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.query_seconds += elapsed
+            self.last_query_seconds = elapsed
+            self.rows_fetched += len(df)
+        df = df.reindex(columns=COLUMNS)
+        df["ts"] = pd.to_datetime(df["ts"], utc=True)
+        for col in COLUMNS[1:]:
+            df[col] = df[col].astype(float)
+        return df.set_index("ts")
+
+    def get(self, symbol, days):
+        """Rows of the last `days` days for symbol (ts index, UTC), or an empty frame."""
+        since = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)).normalize()
+        with self._symbol_lock(symbol):
+            cached = self._frames.get(symbol)
+            if cached is None:
+                frame = self._query(symbol, since)
+                self.misses += 1
+                self._checked[symbol] = self.clock()
+            else:
+                frame = cached
+                if since < self._start[symbol]:
+                    # longer window than before: fetch only the older gap
+                    older = self._query(symbol, since, self._start[symbol])
+                    frame = pd.concat([older, frame]) if not older.empty else frame
+                    self.misses += 1
+                if self.clock() - self._checked.get(symbol, float("-inf")) >= self.refresh_every:
+                    if frame.empty:
+                        frame = self._query(symbol, min(since, self._start[symbol]))
+                        self.misses += 1
+                    else:
+                        newer = self._query(symbol, frame.index[-1])
+                        if not newer.empty:
+                            frame = pd.concat([frame, newer])
+                            frame = frame[~frame.index.duplicated(keep="last")]
+                        self.deltas += 1
+                    self._checked[symbol] = self.clock()
+                elif frame is cached:
+                    self.hits += 1
+                    telemetry.count("cache_hits", stage="price_cache")
+            self._days[symbol] = max(days, self._days.get(symbol, days))
+            keep_from = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=self._days[symbol])).normalize()
+            if len(frame) and frame.index[0] < keep_from:
+                frame = frame[frame.index >= keep_from]
+            self._frames[symbol] = frame
+            self._start[symbol] = max(min(since, self._start.get(symbol, since)), keep_from)
+        return frame[frame.index >= since]
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            for d in (self._frames, self._start, self._days, self._checked):
+                if symbol is None:
+                    d.clear()
+                else:
+                    d.pop(symbol, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "symbols": len(self._frames),
+                "rows": sum(len(f) for f in self._frames.values()),
+                "hits": self.hits,
+                "deltas": self.deltas,
+                "misses": self.misses,
+                "rows_fetched": self.rows_fetched,
+                "query_seconds": self.query_seconds,
+                "last_query_seconds": self.last_query_seconds,
+            }
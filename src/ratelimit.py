@@ -0,0 +1,47 @@
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` requests per second on average, bursts of up to `capacity`.
+    acquire() blocks the calling thread until a token is available; acquire_async() awaits instead.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1.0):
+        """Take tokens if available; otherwise return the seconds to wait."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1.0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            self.sleep(wait)
+
+    async def acquire_async(self, tokens=1.0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
@@ -0,0 +1,139 @@
+# src/scoring_service.py
+"""
+Background scoring: every `interval` seconds the whole symbol universe is scored and the
+results are bulk-written to realtime_signals, so the dashboard only has to read them.
+- live bars come from one grouped fetch (fetch_live.get_live_data_many) of a short history
+  per symbol, from which MODEL_FEATURES (or the pooled model's features) are computed
+- models come from the in-process ModelRegistry (loaded once, reloaded when retrained)
+- a symbol is skipped when neither its last input bar nor its model changed since the
+  previous cycle
+usage: python src/scoring_service.py [interval_seconds]
+"""
+import os
+import sys
+import glob
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.fetch_live import get_live_data_many
+from src.model_registry import registry as default_registry, POOLED_SYMBOL
+from src.predict_realtime import _label
+from src.pooled_model import PooledSymbolModel, LOOKBACK as POOLED_LOOKBACK
+from src.features import MODEL_LOOKBACK, model_input
+from src.signals import write_signals
+from src import telemetry
+
+
+def discover_universe(model_dir):
+    """Symbols with a trained model (models/<SYMBOL>_lgbm.txt or .pkl); the pooled model is not a symbol."""
+    paths = glob.glob(os.path.join(model_dir, "*_lgbm.txt")) + glob.glob(os.path.join(model_dir, "*_lgbm.pkl"))
+    return sorted({os.path.basename(p).rsplit("_lgbm.", 1)[0] for p in paths} - {POOLED_SYMBOL})
+
+
+class ScoringService:
+    def __init__(self, symbols, engine, registry=default_registry, fetch=get_live_data_many, writer=write_signals,
+                 bars=max(MODEL_LOOKBACK, POOLED_LOOKBACK)):
+        self.symbols = [s.upper() for s in symbols]
+        self.engine = engine
+        self.registry = registry
+        self.fetch = fetch
+        self.writer = writer
+        self.bars = bars  # live bars fetched per symbol for the features
+        self._last_input = {}   # symbol -> (bar ts, close, volume, model id) of the last scored input
+        self.history = []       # per-cycle stats
+
+    def run_cycle(self):
+        """Score changed symbols and write them; returns the cycle's stats."""
+        timings = {}
+        t0 = time.perf_counter()
+        live = self.fetch(self.symbols, bars=self.bars)
+        timings["fetch"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        todo, skipped, missing = [], 0, []
+        for sym in self.symbols:
+            df = live.get(sym)
+            model = self.registry.get(sym)
+            if df is None or df.empty or model is None:
+                missing.append(sym)
+                continue
+            bar = df.iloc[-1]
+            key = (bar.get("ts", df.index[-1]), float(bar["close"]), float(bar["volume"]), id(model))
+            if self._last_input.get(sym) == key:
+                skipped += 1
+                continue
+            todo.append((sym, model, df, key))
+        timings["load"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        rows, scored = [], []
+        for sym, model, df, key in todo:
+            bar = df.iloc[-1]
+            if isinstance(model, PooledSymbolModel):
+                proba = model.predict_proba(df.tail(model.lookback))[-1:]
+            else:
+                X = model_input(df)
+                if np.isnan(X).any():
+                    missing.append(sym)  # not enough bars yet for the feature windows
+                    continue
+                proba = model.predict_proba(X)
+            actions, _ = _label(model, proba)
+            classes = list(getattr(model, "classes_", [0, 1]))
+            rows.append({
+                "symbol": sym,
+                "ts": pd.Timestamp(key[0]).to_pydatetime(),
+                "last_price": float(bar["close"]),
+                "prob_up": float(proba[0, classes.index(1)]),
+                "label": str(actions[0]),
+                "expected_return": None,  # classifier only; no return model yet
+                "model_name": getattr(model, "model_name", None) or os.path.basename(self.registry.path_for(sym)),
+            })
+            scored.append((sym, key))
+        timings["predict"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        written = self.writer(self.engine, rows)
+        timings["write"] = time.perf_counter() - t0
+        # remember inputs only once they are stored, so a failed write is retried next cycle
+        for sym, key in scored:
+            self._last_input[sym] = key
+
+        stats = {
+            "symbols": len(self.symbols),
+            "scored": written,
+            "skipped": skipped,
+            "missing": missing,
+            **{f"t_{k}": v for k, v in timings.items()},
+            "cycle_seconds": sum(timings.values()),
+        }
+        self.history.append(stats)
+        return stats
+
+    def latency_percentiles(self, last=None):
+        """p50/p95/p99 of cycle durations over the recorded (or last N) cycles."""
+        return telemetry.cycle_percentiles(self.history, last)
+
+    def run_forever(self, interval=60):
+        while True:
+            try:
+                stats = self.run_cycle()
+            except Exception as e:
+                print(f"❌ scoring cycle failed: {e}")
+                time.sleep(interval)
+                continue
+            p = self.latency_percentiles(last=100)
+            print(f"✔ scored {stats['scored']}, skipped {stats['skipped']} unchanged, "
+                  f"{len(stats['missing'])} without data/model in {stats['cycle_seconds']:.2f}s "
+                  f"(p50 {p['p50']*1000:.0f}ms, p95 {p['p95']*1000:.0f}ms)")
+            time.sleep(max(0.0, interval - stats["cycle_seconds"]))
+
+
+if __name__ == "__main__":
+    from db import engine
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    symbols = discover_universe(default_registry.model_dir)
+    print(f"scoring {len(symbols)} symbols every {interval:.0f}s")
+    ScoringService(symbols, engine).run_forever(interval)
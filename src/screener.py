@@ -0,0 +1,279 @@
+# src/screener.py
+"""
+Universe-wide screener: the insights.quick_insights rules evaluated for every symbol at once.
+
+Closes are held as a 2-D (time x symbol) panel and the indicators are computed on whole
+columns with NumPy, matching insights.add_indicators:
+- sma_10 / sma_50 -> close.rolling(window, min_periods=1).mean()   (windowed cumsums)
+- rsi             -> ta's RSI(14)        (Wilder recursion over time, vectorized across symbols)
+- volatility_20   -> close.pct_change().rolling(20).std()          (windowed cumsums of r, r^2)
+Between appends only the state the next bar needs is kept (last 50 closes, RSI averages,
+running mean of volatility_20), so append() costs O(new bars x symbols), not a recompute.
+
+Rules (same thresholds and wording as quick_insights): SMA10/SMA50 crossover, RSI > 70 / < 30,
+volatility_20 > 1.8x its mean over the loaded history; trend (close vs SMA50) and last change
+are reported for every symbol.
+
+Panel rows are the union of the symbols' timestamps. A symbol's gaps after its first bar are
+forward-filled (bar unchanged); rows before its first bar are ignored.
+usage: python src/screener.py [n_symbols] [bars]   (timings vs the per-symbol chain)
+parity with quick_insights, and of append() with a full reload: tests/test_screener.py
+"""
+import os
+import sys
+import threading
+import numpy as np
+import pandas as pd
+
+try:
+    from src import telemetry
+except ImportError:
+    import telemetry
+
+SMA_FAST = 10
+SMA_SLOW = 50
+RSI_WINDOW = 14
+VOL_WINDOW = 20
+RSI_HIGH = 70
+RSI_LOW = 30
+VOL_SPIKE = 1.8
+TAIL = max(SMA_SLOW, VOL_WINDOW + 1)  # closes carried between appends
+
+CONDITIONS = {
+    "bullish_cross": "✨ Bullish crossover: 10-day SMA crossed above 50-day SMA",
+    "bearish_cross": "⚠️ Bearish crossover: 10-day SMA crossed below 50-day SMA",
+    "overbought": "🔴 RSI > 70 — overbought",
+    "oversold": "🟢 RSI < 30 — oversold",
+    "volatility_spike": "⚡ Volatility spike detected (big move)",
+}
+
+
+def to_panel(df, value="close"):
+    """Wide (ts x symbol) float panel from a long (symbol, ts, close) frame; wide frames pass through."""
+    if "symbol" in df.columns:
+        df = df.drop_duplicates(["ts", "symbol"], keep="last").pivot(index="ts", columns="symbol", values=value)
+    df = df.copy()
+    df.index = pd.to_datetime(df.index, utc=True)
+    df.columns = [str(c) for c in df.columns]
+    return df.sort_index().astype(float)
+
+
+def _window_sums(x, window, first):
+    """Sum and count of the non-NaN values of x over the trailing window, for rows first..end."""
+    valid = ~np.isnan(x)
+    total = np.zeros((len(x) + 1, x.shape[1]))
+    count = np.zeros((len(x) + 1, x.shape[1]))
+    np.cumsum(np.where(valid, x, 0.0), axis=0, out=total[1:])
+    np.cumsum(valid, axis=0, out=count[1:])
+    hi = np.arange(first, len(x)) + 1
+    lo = np.maximum(hi - window, 0)
+    return total[hi] - total[lo], count[hi] - count[lo]
+
+
+class UniverseScreener:
+    def __init__(self):
+        self.symbols = []
+        self._columns = {}  # symbol -> panel column
+        self.last_ts = None
+        self._state = self._empty_state(0)
+        self._undo = None   # state before the last bar, so a revised last bar can be replayed
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty_state(n):
+        nan = np.full(n, np.nan)
+        return {
+            "tail": np.full((TAIL, n), np.nan),
+            "close": np.full((2, n), np.nan),      # previous and last bar
+            "sma_fast": np.full((2, n), np.nan),
+            "sma_slow": np.full((2, n), np.nan),
+            "rsi_up": nan.copy(), "rsi_down": nan.copy(), "rsi_count": np.zeros(n),
+            "vol": nan.copy(), "vol_sum": np.zeros(n), "vol_count": np.zeros(n),
+        }
+
+    def _add_symbols(self, symbols):
+        new = [s for s in symbols if s not in self._columns]
+        if not new:
+            return
+        pad = self._empty_state(len(new))
+        for state in filter(None, (self._state, self._undo)):
+            for key, arr in state.items():
+                state[key] = np.concatenate([arr, pad[key]], axis=-1)
+        self._columns.update((s, len(self.symbols) + i) for i, s in enumerate(new))
+        self.symbols.extend(new)
+
+    def _advance(self, block):
+        """Feed new rows (M x n_symbols closes, ascending) into the state."""
+        st = self._state
+        m = len(block)
+        data = pd.DataFrame(np.vstack([st["tail"], block])).ffill().to_numpy()
+        k = len(data)
+
+        # SMAs are only needed for the last two bars (crossover)
+        for key, window in (("sma_fast", SMA_FAST), ("sma_slow", SMA_SLOW)):
+            total, count = _window_sums(data[-(window + 1):], window, window - 1)
+            st[key] = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+        # volatility_20 for every new bar: its history mean is the spike baseline
+        ret = data[1:] / data[:-1] - 1.0
+        s1, n = _window_sums(ret, VOL_WINDOW, len(ret) - m)
+        s2, _ = _window_sums(ret * ret, VOL_WINDOW, len(ret) - m)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (s2 - s1 * s1 / n) / (n - 1)
+        vol = np.where(n == VOL_WINDOW, np.sqrt(np.maximum(var, 0.0)), np.nan)
+        st["vol"] = vol[-1]
+        st["vol_sum"] += np.nansum(vol, axis=0)
+        st["vol_count"] += (~np.isnan(vol)).sum(axis=0)
+
+        # RSI: Wilder averages (ewm alpha=1/14, adjust=False); the first diff of a symbol counts as 0
+        alpha = 1.0 / RSI_WINDOW
+        up, down, count = st["rsi_up"], st["rsi_down"], st["rsi_count"]
+        prev = data[k - m - 1]
+        for row in data[k - m:]:
+            ok = ~np.isnan(row)
+            diff = np.where(np.isnan(prev), 0.0, row - prev)
+            gain, loss = np.maximum(diff, 0.0), np.maximum(-diff, 0.0)
+            first = ok & (count == 0)
+            up = np.where(first, gain, np.where(ok, (1 - alpha) * up + alpha * gain, up))
+            down = np.where(first, loss, np.where(ok, (1 - alpha) * down + alpha * loss, down))
+            count = count + ok
+            prev = row
+        st["rsi_up"], st["rsi_down"], st["rsi_count"] = up, down, count
+
+        st["close"] = data[-2:]
+        st["tail"] = data[-TAIL:]
+
+    def append(self, df):
+        """
+        Add new bars: a long (symbol, ts, close) frame or a wide (ts x symbol) close panel.
+        Bars older than the last processed ts are ignored; bars at the last ts replace it
+        (an intraday bar still forming). Returns the number of panel rows processed.
+        """
+        panel = to_panel(df)
+        with self._lock, telemetry.span("screener_append", symbols=panel.shape[1]) as sp:
+            self._add_symbols(list(panel.columns))
+            panel = panel.reindex(columns=self.symbols)
+            if self.last_ts is not None:
+                if self._undo is not None and (panel.index == self.last_ts).any():
+                    # replay the last bar; symbols not in this update keep their last close
+                    panel = panel[panel.index >= self.last_ts].copy()
+                    panel.iloc[0] = panel.iloc[0].fillna(pd.Series(self._state["close"][1], index=self.symbols))
+                    self._state = {k: v.copy() for k, v in self._undo.items()}
+                else:
+                    panel = panel[panel.index > self.last_ts]
+            if panel.empty:
+                return 0
+            block = panel.to_numpy()
+            if len(block) > 1:
+                self._advance(block[:-1])
+            self._undo = {k: v.copy() for k, v in self._state.items()}
+            self._advance(block[-1:])
+            self.last_ts = panel.index[-1]
+            sp.add(rows=len(block))
+            return len(block)
+
+    def load(self, df):
+        """Reset and build the state from a full history."""
+        with self._lock:
+            self.symbols, self._columns, self.last_ts, self._undo = [], {}, None, None
+            self._state = self._empty_state(0)
+        return self.append(df)
+
+    def latest(self):
+        """One row per symbol: last bar's close, change and indicators, trend and crossover flags."""
+        with self._lock:
+            st = {k: v.copy() for k, v in self._state.items()}
+            symbols = list(self.symbols)
+        prev_close, close = st["close"]
+        fast_prev, fast = st["sma_fast"]
+        slow_prev, slow = st["sma_slow"]
+        up, down = st["rsi_up"], st["rsi_down"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rsi = np.where(down == 0, 100.0, 100.0 - 100.0 / (1.0 + up / down))
+            rsi = np.where(st["rsi_count"] >= RSI_WINDOW, rsi, np.nan)
+            vol_mean = np.where(st["vol_count"] > 0, st["vol_sum"] / st["vol_count"], np.nan)
+            out = pd.DataFrame({
+                "close": close,
+                "change_pct": (close - prev_close) / prev_close * 100,
+                "sma_10": fast,
+                "sma_50": slow,
+                "rsi": rsi,
+                "volatility_20": st["vol"],
+                "vol_ratio": st["vol"] / vol_mean,
+                "trend": np.where(close > slow, 1, -1),
+                "crossover": np.select([(fast > slow) & (fast_prev <= slow_prev),
+                                        (fast < slow) & (fast_prev >= slow_prev)], [1, -1], 0),
+            }, index=pd.Index(symbols, name="symbol"))
+        return out[out["close"].notna()]
+
+    def screen(self, conditions=None):
+        """
+        Ranked table of triggered conditions: one row per (symbol, condition) with the
+        indicator value and the quick_insights message. Symbols with more triggered
+        conditions come first, then larger absolute last change.
+        """
+        snap = self.latest()
+        spread = (snap["sma_10"] / snap["sma_50"] - 1) * 100
+        hits = {
+            "bullish_cross": (snap["crossover"] == 1, spread),
+            "bearish_cross": (snap["crossover"] == -1, spread),
+            "overbought": (snap["rsi"] > RSI_HIGH, snap["rsi"]),
+            "oversold": (snap["rsi"] < RSI_LOW, snap["rsi"]),
+            "volatility_spike": (snap["vol_ratio"] > VOL_SPIKE, snap["vol_ratio"]),
+        }
+        parts = []
+        for name, (mask, value) in hits.items():
+            if conditions is not None and name not in conditions:
+                continue
+            parts.append(pd.DataFrame({"symbol": snap.index[mask], "condition": name,
+                                       "value": value[mask].to_numpy(), "message": CONDITIONS[name]}))
+        columns = ["symbol", "condition", "value", "message", "triggered", "change_pct", "close"]
+        if not parts or not sum(len(p) for p in parts):
+            return pd.DataFrame(columns=columns)
+        table = pd.concat([p for p in parts if len(p)], ignore_index=True)
+        table["triggered"] = table.groupby("symbol")["condition"].transform("size")
+        table["change_pct"] = table["symbol"].map(snap["change_pct"])
+        table["close"] = table["symbol"].map(snap["close"])
+        table["_abs_change"] = table["change_pct"].abs()
+        table = table.sort_values(["triggered", "_abs_change", "symbol"], ascending=[False, False, True])
+        return table[columns].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # timings against the per-symbol fetch_and_prepare -> add_indicators -> quick_insights chain
+    import time
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from insights import fetch_and_prepare, add_indicators, quick_insights
+    from synthetic_data import generate_universe
+
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    bars = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    universe = generate_universe(n_symbols, bars + 20, "daily", seed=5)
+    # staggered listings: symbol i starts i % 30 bars late
+    universe = universe[universe.groupby("symbol").cumcount() >= universe["symbol"].str[3:].astype(int) % 30]
+    last_ts = np.sort(universe["ts"].unique())[bars - 1]
+    history = universe[universe["ts"] <= last_ts]
+    fresh = universe[universe["ts"] > last_ts]
+
+    t0 = time.perf_counter()
+    for sym, g in history.groupby("symbol"):
+        quick_insights(add_indicators(fetch_and_prepare(g.set_index("ts")[["close"]])))
+    loop_s = time.perf_counter() - t0
+
+    screener = UniverseScreener()
+    t0 = time.perf_counter()
+    screener.load(history)
+    table = screener.screen()
+    panel_s = time.perf_counter() - t0
+
+    print(f"{n_symbols} symbols x {bars} bars: per-symbol chain {loop_s * 1000:.0f} ms, "
+          f"screener load + screen {panel_s * 1000:.0f} ms ({loop_s / panel_s:.0f}x)")
+    print(f"triggered conditions: {len(table)} rows, {table['symbol'].nunique()} symbols")
+
+    t0 = time.perf_counter()
+    for ts, bar in fresh.groupby("ts"):
+        screener.append(bar)
+        screener.screen()
+    per_bar = (time.perf_counter() - t0) / max(fresh["ts"].nunique(), 1)
+    print(f"incremental: {per_bar * 1000:.2f} ms per appended bar (append + screen)")
+    print(screener.screen().head(10).to_string())
@@ -0,0 +1,40 @@
+# src/signals.py
+"""
+Read/write helpers for the realtime_signals table.
+Engine-agnostic (no config import) so both the scoring service and the dashboard use them.
+"""
+import pandas as pd
+from sqlalchemy import text, bindparam
+
+SIGNAL_COLUMNS = ["symbol", "ts", "last_price", "prob_up", "label", "expected_return", "model_name"]
+
+INSERT = text(f"INSERT INTO realtime_signals ({', '.join(SIGNAL_COLUMNS)}) "
+              f"VALUES ({', '.join(':' + c for c in SIGNAL_COLUMNS)})")
+
+# one row per symbol, served by realtime_signals_symbol_ts_idx (symbol, ts DESC)
+LATEST = text(f"""
+    SELECT DISTINCT ON (symbol) {', '.join(SIGNAL_COLUMNS)}
+    FROM realtime_signals
+    WHERE symbol IN :symbols
+    ORDER BY symbol, ts DESC, id DESC
+""").bindparams(bindparam("symbols", expanding=True))
+
+
+def write_signals(engine, rows):
+    """Insert a batch of signal dicts (keys: SIGNAL_COLUMNS) in one executemany round trip."""
+    if not rows:
+        return 0
+    rows = [{c: r.get(c) for c in SIGNAL_COLUMNS} for r in rows]
+    with engine.begin() as conn:
+        conn.execute(INSERT, rows)
+    return len(rows)
+
+
+def latest_signals(engine, symbols):
+    """Latest signal per symbol as a DataFrame indexed by symbol (symbols without a signal are absent)."""
+    with engine.connect() as conn:
+        df = pd.read_sql_query(LATEST, conn, params={"symbols": list(symbols)})
+    for col in ["last_price", "prob_up", "expected_return"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    df["ts"] = pd.to_datetime(df["ts"], utc=True)
+    return df.set_index("symbol")
@@ -0,0 +1,242 @@
+# src/storage.py
+"""
+Price storage backends.
+
+PriceStore is the interface every reader/writer of the prices table goes through
+(db.py picks the active backend from STORAGE_BACKEND):
+- PostgresStore (db.py): the prices table
+- ParquetStore (here): local columnar files, no DB server needed
+
+ParquetStore layout (hive partitioning, one file per symbol and year, sorted by ts):
+    <root>/symbol=AAPL/year=2024/part.parquet
+Reads prune partitions by symbol/year from the directory names, then push the ts filter
+and the column list into the Arrow scan (row-group statistics skip non-matching groups);
+files are memory-mapped.
+Writes read-merge-rewrite a year file under an exclusive lock on part.parquet.lock next to
+it (flock, so writers in other processes wait too); readers need no lock, files are
+replaced atomically.
+"""
+import os
+import glob
+import threading
+import contextlib
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): writers are only serialized within one process
+    fcntl = None
+
+PRICE_COLUMNS = ["symbol", "ts", "open", "high", "low", "close", "volume", "source"]
+NUMERIC_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def to_utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _check_columns(columns):
+    unknown = set(columns) - set(PRICE_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown price columns: {sorted(unknown)}")
+
+
+class PriceStore:
+    """Interface of a price backend (same semantics as the original db.py functions)."""
+
+    def read_range(self, symbols, start=None, end=None, columns=None):
+        """symbol, ts + columns for start <= ts < end, ordered by (symbol, ts), numeric as float."""
+        raise NotImplementedError
+
+    def iter_range(self, symbol, start=None, end=None, columns=("close",), chunk_rows=100_000):
+        """One symbol's ts + columns in ascending chunks of up to chunk_rows."""
+        raise NotImplementedError
+
+    def write_prices(self, df):
+        """Upsert on (symbol, ts); returns {"rows", "inserted", "updated", "unchanged", "seconds", "rows_per_sec"}."""
+        raise NotImplementedError
+
+    def max_ts(self, symbols):
+        """{symbol: latest stored ts} (symbols without rows are omitted)."""
+        raise NotImplementedError
+
+    def symbols(self):
+        raise NotImplementedError
+
+
+class ParquetStore(PriceStore):
+    ROW_GROUP_ROWS = 65_536  # small enough for row-group pruning on ts within a year file
+
+    def __init__(self, root):
+        import pyarrow as pa
+        import pyarrow.fs as pafs
+        self.root = os.path.abspath(root)
+        self.fs = pafs.LocalFileSystem(use_mmap=True)
+        self.schema = pa.schema([
+            ("ts", pa.timestamp("us", tz="UTC")),
+            ("open", pa.float64()), ("high", pa.float64()), ("low", pa.float64()),
+            ("close", pa.float64()), ("volume", pa.float64()), ("source", pa.string()),
+        ])
+        self.partitioning_schema = pa.schema([("symbol", pa.string()), ("year", pa.int32())])
+        self._lock = threading.Lock()
+
+    # --- layout ---
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, f"symbol={symbol}")
+
+    def _path(self, symbol, year):
+        return os.path.join(self._symbol_dir(symbol), f"year={year}", "part.parquet")
+
+    def _files(self, symbol, start=None, end=None):
+        files = []
+        for path in glob.glob(os.path.join(self._symbol_dir(symbol), "year=*", "part.parquet")):
+            year = int(os.path.basename(os.path.dirname(path))[len("year="):])
+            if start is not None and year < start.year:
+                continue
+            if end is not None and year > end.year:
+                continue
+            files.append((year, path))
+        return [p for _, p in sorted(files)]
+
+    def symbols(self):
+        return sorted(os.path.basename(p)[len("symbol="):] for p in glob.glob(os.path.join(self.root, "symbol=*")))
+
+    def _dataset(self, files):
+        import pyarrow.dataset as ds
+        return ds.dataset(files, format="parquet", filesystem=self.fs,
+                          partitioning=ds.partitioning(self.partitioning_schema, flavor="hive"),
+                          partition_base_dir=self.root)
+
+    def _filter(self, start, end):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        expr = None
+        for op, ts in (("ge", start), ("lt", end)):
+            if ts is None:
+                continue
+            value = pa.scalar(ts.to_pydatetime(), type=pa.timestamp("us", tz="UTC"))
+            e = ds.field("ts") >= value if op == "ge" else ds.field("ts") < value
+            expr = e if expr is None else expr & e
+        return expr
+
+    # --- reads ---
+    def read_range(self, symbols, start=None, end=None, columns=None):
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        columns = list(columns or NUMERIC_COLUMNS)
+        _check_columns(columns)
+        cols = ["symbol", "ts"] + [c for c in columns if c not in ("symbol", "ts")]
+        start = to_utc(start) if start is not None else None
+        end = to_utc(end) if end is not None else None
+
+        files = [f for sym in dict.fromkeys(symbols) for f in self._files(sym, start, end)]
+        if not files:
+            return pd.DataFrame(columns=cols)
+        table = self._dataset(files).to_table(columns=cols, filter=self._filter(start, end))
+        df = table.to_pandas()
+        df = df.sort_values(["symbol", "ts"], kind="stable").reset_index(drop=True)
+        df["symbol"] = df["symbol"].astype(object)
+        return df
+
+    def iter_range(self, symbol, start=None, end=None, columns=("close",), chunk_rows=100_000):
+        columns = [c for c in columns if c != "ts"]
+        _check_columns(columns)
+        start = to_utc(start) if start is not None else None
+        end = to_utc(end) if end is not None else None
+        cols = ["ts"] + columns
+        for path in self._files(symbol, start, end):  # year files are ts-ordered
+            scanner = self._dataset([path]).scanner(columns=cols, filter=self._filter(start, end),
+                                                    batch_size=chunk_rows, use_threads=False)
+            for batch in scanner.to_batches():
+                if batch.num_rows:
+                    yield batch.to_pandas()
+
+    def max_ts(self, symbols):
+        import pyarrow.parquet as pq
+        out = {}
+        for sym in symbols:
+            files = self._files(sym)
+            if files:
+                ts = pq.read_table(files[-1], columns=["ts"], memory_map=True).column("ts")
+                if len(ts):
+                    out[sym] = pd.Timestamp(ts.to_pandas().max())
+        return out
+
+    # --- writes ---
+    def _normalize(self, df):
+        out = df.reindex(columns=PRICE_COLUMNS).copy()
+        out["ts"] = pd.to_datetime(out["ts"], utc=True)
+        for col in NUMERIC_COLUMNS:
+            out[col] = pd.to_numeric(out[col], errors="coerce").astype(float)
+        out["volume"] = out["volume"].round()  # bigint in Postgres
+        out["source"] = out["source"].astype(object).where(out["source"].notna(), None)
+        return out.drop_duplicates(["symbol", "ts"], keep="last")
+
+    @contextlib.contextmanager
+    def _partition_lock(self, path):
+        """Exclusive lock on one year file across processes (flock on <path>.lock)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(path + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write_file(self, frame, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        frame = frame.reset_index(drop=True)
+        frame["ts"] = frame["ts"].astype("datetime64[us, UTC]")
+        table = pa.Table.from_pandas(frame[self.schema.names], schema=self.schema, preserve_index=False)
+        pq.write_table(table, path + ".tmp", row_group_size=self.ROW_GROUP_ROWS, compression="zstd")
+        os.replace(path + ".tmp", path)
+
+    def write_prices(self, df):
+        import time
+        import pyarrow.parquet as pq
+        t0 = time.perf_counter()
+        stats = {"rows": len(df), "inserted": 0, "updated": 0}
+        new = self._normalize(df)
+        value_cols = ["open", "high", "low", "close", "volume", "source"]
+        with self._lock:
+            for (sym, year), part in new.groupby([new["symbol"], new["ts"].dt.year], sort=False):
+                path = self._path(sym, year)
+                part = part.drop(columns="symbol").set_index("ts")
+                with self._partition_lock(path):
+                    if os.path.exists(path):
+                        old = pq.read_table(path, memory_map=True).to_pandas().set_index("ts")
+                        common = part.index.intersection(old.index)
+                        before = old.loc[common, value_cols]
+                        after = part.loc[common, value_cols]
+                        same = ((before == after) | (before.isna() & after.isna())).all(axis=1)
+                        stats["updated"] += int((~same).sum())
+                        stats["inserted"] += len(part) - len(common)
+                        merged = pd.concat([old.drop(index=common), part]).sort_index()
+                    else:
+                        stats["inserted"] += len(part)
+                        merged = part.sort_index()
+                    self._write_file(merged.reset_index(), path)
+        seconds = time.perf_counter() - t0
+        stats["unchanged"] = stats["rows"] - stats["inserted"] - stats["updated"]
+        stats["seconds"] = seconds
+        stats["rows_per_sec"] = stats["rows"] / seconds if seconds > 0 else float("nan")
+        return stats
+
+
+def copy_prices(source, dest, symbols=None, chunk_rows=500_000):
+    """Copy every row of `symbols` (default: all) from one PriceStore into another; returns rows copied."""
+    rows = 0
+    for sym in symbols or source.symbols():
+        for chunk in source.iter_range(sym, columns=[c for c in PRICE_COLUMNS if c not in ("symbol", "ts")],
+                                       chunk_rows=chunk_rows):
+            chunk.insert(0, "symbol", sym)
+            dest.write_prices(chunk)
+            rows += len(chunk)
+        print(f"✔ {sym}: copied")
+    return rows
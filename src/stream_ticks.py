@@ -0,0 +1,212 @@
+# streaming intraday via Finnhub websocket: trade ticks -> in-memory OHLCV bars -> prices
+import json
+import time
+import queue
+import threading
+import pandas as pd
+from config import FINNHUB_API_KEY
+from db import write_prices
+
+FINNHUB_WS_URL = "wss://ws.finnhub.io"
+
+
+class BarAggregator:
+    """
+    Per-symbol OHLCV bars of `interval` seconds built from trade ticks.
+    A bar is emitted when a tick for a later bar arrives or when close_due() sees that
+    its interval (plus `grace` seconds for stragglers) has passed. Ticks older than the
+    symbol's open bar (e.g. replayed after a reconnect) are dropped and counted as late.
+    """
+
+    def __init__(self, interval=60, grace=2.0):
+        self.interval_ms = int(interval * 1000)
+        self.grace_ms = int(grace * 1000)
+        self.open_bars = {}  # symbol -> dict(start, open, high, low, close, volume)
+        self.closed_until = {}  # symbol -> start of the last emitted bar
+        self.late = 0
+        self._lock = threading.Lock()
+
+    def add(self, symbol, price, volume, ts_ms):
+        """Add one trade; returns the list of bars it completed (0 or 1)."""
+        start = ts_ms - ts_ms % self.interval_ms
+        with self._lock:
+            bar = self.open_bars.get(symbol)
+            if (bar is not None and start < bar["start"]) or start <= self.closed_until.get(symbol, -1):
+                self.late += 1
+                return []
+            done = []
+            if bar is not None and start > bar["start"]:
+                done.append(self._emit(symbol, bar))
+                bar = None
+            if bar is None:
+                self.open_bars[symbol] = {"start": start, "open": price, "high": price,
+                                          "low": price, "close": price, "volume": volume or 0}
+            else:
+                bar["high"] = max(bar["high"], price)
+                bar["low"] = min(bar["low"], price)
+                bar["close"] = price
+                bar["volume"] += volume or 0
+            return done
+
+    def close_due(self, now_ms):
+        """Emit bars whose interval ended more than `grace` ago."""
+        with self._lock:
+            due = [s for s, b in self.open_bars.items() if now_ms >= b["start"] + self.interval_ms + self.grace_ms]
+            return [self._emit(s, self.open_bars.pop(s)) for s in due]
+
+    def close_all(self):
+        with self._lock:
+            bars = [self._emit(s, b) for s, b in self.open_bars.items()]
+            self.open_bars.clear()
+            return bars
+
+    def _emit(self, symbol, bar):
+        # remember the emitted bar so later ticks for it count as late instead of reopening it
+        self.closed_until[symbol] = bar["start"]
+        return {
+            "symbol": symbol,
+            "ts": pd.Timestamp(bar["start"], unit="ms", tz="UTC"),
+            "open": bar["open"],
+            "high": bar["high"],
+            "low": bar["low"],
+            "close": bar["close"],
+            "volume": bar["volume"],
+            "source": f"finnhub_ws_{self.interval_ms // 1000}s",
+        }
+
+
+class TickStream:
+    """
+    WebSocket tick ingestion service.
+    - receiver: websocket-client WebSocketApp, resubscribes on every (re)connect
+    - bars go through a bounded queue; when it is full the receiver blocks, which
+      stops reading the socket (backpressure) instead of growing memory
+    - writer thread flushes completed bars to prices in micro-batches
+    - a failing write is retried (backpressure again) rather than killing the writer thread
+    url can point at a local stand-in serving Finnhub trade messages (finnhub_standin.TradeStandIn).
+    """
+
+    def __init__(self, symbols, token=FINNHUB_API_KEY, url=FINNHUB_WS_URL, interval=60, grace=2.0,
+                 queue_size=10_000, batch_size=500, flush_every=1.0, reconnect_delay=5, writer=write_prices):
+        self.symbols = list(symbols)
+        self.url = f"{url}?token={token}" if token else url
+        self.aggregator = BarAggregator(interval, grace)
+        self.bars = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_every = flush_every
+        self.reconnect_delay = reconnect_delay
+        self.writer = writer
+        self.ws = None
+        self._stop = threading.Event()
+        self._writer_stop = threading.Event()
+        self._flush_open = False
+        self._threads = []
+        self.metrics = {"ticks": 0, "bars_written": 0, "batches": 0, "connects": 0, "write_errors": 0,
+                        "bars_dropped": 0, "lag_ms": None, "started": time.time()}
+
+    # --- receiver side ---
+    def _on_open(self, ws):
+        self.metrics["connects"] += 1
+        for s in self.symbols:
+            ws.send(json.dumps({"type": "subscribe", "symbol": s}))
+
+    def _on_message(self, ws, message):
+        msg = json.loads(message)
+        if msg.get("type") != "trade":
+            return
+        now_ms = time.time() * 1000
+        for t in msg.get("data", []):
+            self.metrics["ticks"] += 1
+            self.metrics["lag_ms"] = now_ms - t["t"]
+            for bar in self.aggregator.add(t["s"], t["p"], t.get("v"), t["t"]):
+                self.bars.put(bar)  # blocks when the writer falls behind
+
+    def _run_socket(self):
+        import websocket
+        while not self._stop.is_set():
+            self.ws = websocket.WebSocketApp(self.url, on_open=self._on_open, on_message=self._on_message)
+            self.ws.run_forever(ping_interval=20, ping_timeout=10)
+            if not self._stop.is_set():
+                time.sleep(self.reconnect_delay)  # dropped: reconnect and resubscribe
+
+    # --- writer side ---
+    def _run_writer(self):
+        batch = []
+        last_flush = time.monotonic()
+        while not (self._writer_stop.is_set() and self.bars.empty()):
+            # bars closed by the clock go straight into the batch: putting them on the bounded
+            # queue this thread drains would block it forever once the queue is full
+            batch.extend(self.aggregator.close_due(time.time() * 1000))
+            try:
+                batch.append(self.bars.get(timeout=0.2))
+            except queue.Empty:
+                pass
+            if batch and (len(batch) >= self.batch_size or time.monotonic() - last_flush >= self.flush_every):
+                self._flush(batch)
+                batch = []
+                last_flush = time.monotonic()
+        if self._flush_open:
+            batch.extend(self.aggregator.close_all())
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """Write one batch; a failed write is retried every reconnect_delay seconds (the queue
+        backs up meanwhile) and dropped only if it still fails once the stream is stopping."""
+        while True:
+            try:
+                self.writer(pd.DataFrame(batch))
+            except Exception as e:
+                self.metrics["write_errors"] += 1
+                print(f"❌ writing {len(batch)} bars failed: {e}")
+                if self._writer_stop.is_set():
+                    self.metrics["bars_dropped"] += len(batch)
+                    return False
+                self._writer_stop.wait(self.reconnect_delay)
+                continue
+            self.metrics["bars_written"] += len(batch)
+            self.metrics["batches"] += 1
+            return True
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._run_socket, daemon=True),
+                         threading.Thread(target=self._run_writer, daemon=True)]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self, flush_open=True):
+        # stop receiving first, then let the writer drain everything that is left
+        self._stop.set()
+        if self.ws is not None:
+            # the receiver thread tears down on the next frame it reads (the server's answer to this
+            # close); closing the socket from this thread would leave it in select() until ping_timeout
+            self.ws.keep_running = False
+            try:
+                self.ws.sock.send_close()
+            except Exception:
+                self.ws.close()
+        socket_thread, writer_thread = self._threads
+        socket_thread.join(timeout=10)
+        self._flush_open = flush_open  # the writer closes the open bars itself after draining the queue
+        self._writer_stop.set()
+        writer_thread.join(timeout=10)
+
+    def stats(self):
+        elapsed = max(time.time() - self.metrics["started"], 1e-9)
+        return {
+            **self.metrics,
+            "ticks_per_sec": self.metrics["ticks"] / elapsed,
+            "queue_depth": self.bars.qsize(),
+            "late_ticks": self.aggregator.late,
+        }
+
+
+if __name__ == "__main__":
+    stream = TickStream(["AAPL", "MSFT", "GOOGL"], interval=60).start()
+    try:
+        while True:
+            time.sleep(30)
+            print(stream.stats())
+    except KeyboardInterrupt:
+        stream.stop()
@@ -0,0 +1,227 @@
+# src/streaming_indicators.py
+"""
+Streaming (O(1) per bar) versions of the indicators in insights.add_indicators.
+
+Each indicator keeps only the state it needs and matches the batch output:
+- SMA  -> close.rolling(window, min_periods=1).mean()
+- EMA  -> close.ewm(span=span, adjust=False).mean()
+- RSI  -> ta.momentum.RSIIndicator(close, window).rsi()
+- MACD -> ta.trend.MACD(close, 26, 12, 9).macd() / .macd_signal()
+- Volatility -> close.pct_change().rolling(window).std()
+
+State is a plain dict (json-serializable) so a process can resume without replaying history.
+Closes are expected to be numeric (no NaN), as produced by fetch_and_prepare + dropna.
+"""
+import json
+import math
+from collections import deque
+
+NAN = float("nan")
+
+
+class SMA:
+    def __init__(self, window, min_periods=1):
+        self.window = window
+        self.min_periods = min_periods
+        self.values = deque()
+        # Kahan-compensated running sum (same approach as pandas' rolling mean)
+        self.total = 0.0
+        self.comp = 0.0
+
+    def _add(self, x):
+        y = x - self.comp
+        t = self.total + y
+        self.comp = (t - self.total) - y
+        self.total = t
+
+    def update(self, x):
+        self.values.append(x)
+        self._add(x)
+        if len(self.values) > self.window:
+            self._add(-self.values.popleft())
+        n = len(self.values)
+        return self.total / n if n >= self.min_periods else NAN
+
+    def get_state(self):
+        return {"values": list(self.values), "total": self.total, "comp": self.comp}
+
+    def set_state(self, state):
+        self.values = deque(state["values"])
+        self.total = state["total"]
+        self.comp = state["comp"]
+
+
+class EMA:
+    """ewm(adjust=False) with either span or alpha; NaN until min_periods observations."""
+
+    def __init__(self, span=None, alpha=None, min_periods=0):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.min_periods = min_periods
+        self.value = None
+        self.count = 0
+
+    def update(self, x):
+        if x is None or math.isnan(x):
+            # pandas ewm skips leading NaNs; later gaps do not occur for our inputs
+            return self.value if self.value is not None and self.count >= self.min_periods else NAN
+        self.count += 1
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value if self.count >= self.min_periods else NAN
+
+    def get_state(self):
+        return {"value": self.value, "count": self.count}
+
+    def set_state(self, state):
+        self.value = state["value"]
+        self.count = state["count"]
+
+
+class RSI:
+    def __init__(self, window=14):
+        self.window = window
+        self.up = EMA(alpha=1.0 / window, min_periods=window)
+        self.down = EMA(alpha=1.0 / window, min_periods=window)
+        self.prev = None
+
+    def update(self, close):
+        diff = 0.0 if self.prev is None else close - self.prev  # ta maps the leading NaN diff to 0
+        self.prev = close
+        up = self.up.update(diff if diff > 0 else 0.0)
+        down = self.down.update(-diff if diff < 0 else 0.0)
+        if math.isnan(down):
+            return NAN
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+    def get_state(self):
+        return {"prev": self.prev, "up": self.up.get_state(), "down": self.down.get_state()}
+
+    def set_state(self, state):
+        self.prev = state["prev"]
+        self.up.set_state(state["up"])
+        self.down.set_state(state["down"])
+
+
+class MACD:
+    def __init__(self, window_slow=26, window_fast=12, window_sign=9):
+        self.fast = EMA(span=window_fast, min_periods=window_fast)
+        self.slow = EMA(span=window_slow, min_periods=window_slow)
+        self.signal = EMA(span=window_sign, min_periods=window_sign)
+
+    def update(self, close):
+        macd = self.fast.update(close) - self.slow.update(close)
+        return macd, self.signal.update(macd)
+
+    def get_state(self):
+        return {"fast": self.fast.get_state(), "slow": self.slow.get_state(), "signal": self.signal.get_state()}
+
+    def set_state(self, state):
+        self.fast.set_state(state["fast"])
+        self.slow.set_state(state["slow"])
+        self.signal.set_state(state["signal"])
+
+
+class Volatility:
+    """Rolling sample std of 1-bar returns (Welford add/remove)."""
+
+    def __init__(self, window=20):
+        self.window = window
+        self.prev = None
+        self.returns = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, close):
+        if self.prev is None:
+            self.prev = close
+            return NAN
+        r = close / self.prev - 1.0
+        self.prev = close
+
+        self.returns.append(r)
+        n = len(self.returns)
+        delta = r - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (r - self.mean)
+
+        if n > self.window:
+            old = self.returns.popleft()
+            n -= 1
+            delta = old - self.mean
+            self.mean -= delta / n
+            self.m2 -= delta * (old - self.mean)
+
+        if n < self.window:
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / (n - 1))
+
+    def get_state(self):
+        return {"prev": self.prev, "returns": list(self.returns), "mean": self.mean, "m2": self.m2}
+
+    def set_state(self, state):
+        self.prev = state["prev"]
+        self.returns = deque(state["returns"])
+        self.mean = state["mean"]
+        self.m2 = state["m2"]
+
+
+class IndicatorEngine:
+    """Bundle producing the same columns as insights.add_indicators, one bar at a time."""
+
+    COLUMNS = ["sma_10", "sma_50", "ema_20", "rsi", "macd", "macd_signal", "volatility_20"]
+    _PARTS = ["sma_10", "sma_50", "ema_20", "rsi", "macd", "volatility_20"]
+
+    def __init__(self):
+        self.sma_10 = SMA(10)
+        self.sma_50 = SMA(50)
+        self.ema_20 = EMA(span=20)
+        self.rsi = RSI(14)
+        self.macd = MACD(26, 12, 9)
+        self.volatility_20 = Volatility(20)
+        self.last_ts = None
+
+    def update(self, close, ts=None):
+        close = float(close)
+        macd, signal = self.macd.update(close)
+        self.last_ts = ts if ts is not None else self.last_ts
+        return {
+            "sma_10": self.sma_10.update(close),
+            "sma_50": self.sma_50.update(close),
+            "ema_20": self.ema_20.update(close),
+            "rsi": self.rsi.update(close),
+            "macd": macd,
+            "macd_signal": signal,
+            "volatility_20": self.volatility_20.update(close),
+        }
+
+    def warm_up(self, closes):
+        """Feed historical closes (iterable); returns the last row of values."""
+        last = None
+        for c in closes:
+            last = self.update(c)
+        return last
+
+    def get_state(self):
+        return {
+            "last_ts": None if self.last_ts is None else str(self.last_ts),
+            **{name: getattr(self, name).get_state() for name in self._PARTS},
+        }
+
+    def set_state(self, state):
+        self.last_ts = state.get("last_ts")
+        for name in self._PARTS:
+            getattr(self, name).set_state(state[name])
+
+    def to_json(self):
+        return json.dumps(self.get_state())
+
+    @classmethod
+    def from_json(cls, payload):
+        engine = cls()
+        engine.set_state(json.loads(payload))
+        return engine
+
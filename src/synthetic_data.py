@@ -0,0 +1,50 @@
+# src/synthetic_data.py
+"""
+Seeded synthetic OHLCV bars for benchmarks and offline runs.
+Closes follow a geometric random walk per symbol; open/high/low/volume are derived from it
+so that low <= open, close <= high always holds. Same seed -> identical frames.
+"""
+import numpy as np
+import pandas as pd
+
+FREQS = {
+    "daily": ("B", 0.015),     # business days, ~1.5% daily vol
+    "minute": ("min", 0.0008),
+}
+
+
+def generate_symbol(bars, freq="daily", seed=0, start="2010-01-04", start_price=100.0):
+    """One symbol's bars as a frame with ts, open, high, low, close, volume."""
+    rule, vol = FREQS[freq]
+    rng = np.random.default_rng(seed)
+    log_ret = rng.normal(0.0, vol, bars)
+    close = start_price * np.exp(np.cumsum(log_ret))
+    open_ = np.empty(bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * np.exp(rng.normal(0.0, vol / 4, bars - 1))
+    spread = np.abs(rng.normal(0.0, vol / 2, bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread * rng.uniform(0.5, 1.0, bars)
+    volume = rng.lognormal(13.0, 0.5, bars).round()
+    return pd.DataFrame({
+        "ts": pd.date_range(start, periods=bars, freq=rule, tz="UTC"),
+        "open": open_, "high": high, "low": low, "close": close, "volume": volume,
+    })
+
+
+def generate_universe(n_symbols, bars, freq="daily", seed=0, start="2010-01-04"):
+    """Long frame (symbol, ts, open, high, low, close, volume) for SYM0001..SYMnnnn."""
+    frames = []
+    for i in range(n_symbols):
+        df = generate_symbol(bars, freq, seed=seed * 100_003 + i, start=start,
+                             start_price=20.0 + 5.0 * (i % 40))
+        df.insert(0, "symbol", f"SYM{i + 1:04d}")
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_yfinance(df):
+    """Single-symbol frame in yfinance's shape (ts index, Open/High/Low/Close/Volume) for FixtureSource."""
+    out = df.set_index("ts")[["open", "high", "low", "close", "volume"]]
+    out.columns = ["Open", "High", "Low", "Close", "Volume"]
+    return out
@@ -0,0 +1,277 @@
+# src/telemetry.py
+"""
+Lightweight pipeline instrumentation: timing spans + counters.
+
+    with telemetry.span("fetch_live", symbols=len(symbols)) as sp:
+        ...
+        sp.add(rows=len(df), cache_hits=hits)
+
+- disabled by default; span() then returns a shared no-op object (one flag check per call)
+- enable with PIPELINE_METRICS=1, or PIPELINE_METRICS_LOG=<path> to also append one JSON
+  line per span, or call enable(...) from code
+- @timed(stage) wraps a whole function the same way
+- numeric span fields are summed into per-stage counters; durations go into a histogram
+- prometheus_text() / write_prometheus(path) / serve_prometheus(port) export the metrics
+- percentiles(values) / cycle_percentiles(history) for the pollers' and services' own stats
+CLI: python src/telemetry.py summarize <log.jsonl> [...]   (p50/p95/p99 per stage)
+"""
+import os
+import sys
+import json
+import time
+import functools
+import threading
+from collections import defaultdict
+
+# one instance whether imported as `telemetry` (scripts in src/) or `src.telemetry` (dashboard)
+sys.modules.setdefault("telemetry", sys.modules[__name__])
+sys.modules.setdefault("src.telemetry", sys.modules[__name__])
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = False
+_log = None
+_lock = threading.Lock()
+_hist = {}                              # stage -> [bucket counts..., +Inf count, sum]
+_counters = defaultdict(float)          # (name, stage) -> value
+
+
+class _Span:
+    __slots__ = ("stage", "fields", "t0")
+
+    def __init__(self, stage, fields):
+        self.stage = stage
+        self.fields = fields
+
+    def add(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record(self.stage, time.perf_counter() - self.t0, self.fields, exc_type is not None)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def add(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(stage, **fields):
+    """Context manager timing one stage; extra fields go to the log (numeric ones also to counters)."""
+    if not _enabled:
+        return _NOOP
+    return _Span(stage, fields)
+
+
+def timed(stage, fields=None):
+    """Decorator version of span(); fields(result) -> dict of extra span fields (e.g. rows)."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(stage, {}) as sp:
+                out = fn(*args, **kwargs)
+                if fields is not None:
+                    sp.add(**fields(out))
+                return out
+        return inner
+    return wrap
+
+
+def frame_fields(df):
+    """rows/bytes of a DataFrame result (shallow memory usage, cheap)."""
+    if df is None:
+        return {"rows": 0}
+    return {"rows": len(df), "bytes": int(df.memory_usage(index=True, deep=False).sum())}
+
+
+def count(name, value=1, stage=""):
+    """Add value to counter `name` (optionally scoped to a stage)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[(name, stage)] += value
+
+
+def enabled():
+    return _enabled
+
+
+def enable(log_path=None):
+    """Start collecting; with log_path every span is appended to it as a JSON line."""
+    global _enabled, _log
+    with _lock:
+        if _log is not None:
+            _log.close()
+        _log = open(log_path, "a", buffering=1) if log_path else None
+        _enabled = True
+
+
+def disable():
+    global _enabled, _log
+    with _lock:
+        _enabled = False
+        if _log is not None:
+            _log.close()
+            _log = None
+
+
+def reset():
+    with _lock:
+        _hist.clear()
+        _counters.clear()
+
+
+def _record(stage, seconds, fields, error):
+    with _lock:
+        h = _hist.get(stage)
+        if h is None:
+            h = _hist[stage] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, le in enumerate(BUCKETS):
+            if seconds <= le:
+                h[i] += 1
+                break
+        else:
+            h[len(BUCKETS)] += 1
+        h[-1] += seconds
+        if error:
+            _counters[("errors", stage)] += 1
+        for key, value in fields.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                _counters[(key, stage)] += value
+        if _log is not None:
+            _log.write(json.dumps({"ts": time.time(), "stage": stage, "seconds": seconds,
+                                   "error": error, **fields}, default=str) + "\n")
+
+
+def snapshot():
+    """{"stages": {stage: {"count", "sum"}}, "counters": {(name, stage): value}} (copies)."""
+    with _lock:
+        stages = {s: {"count": sum(h[:-1]), "sum": h[-1]} for s, h in _hist.items()}
+        return {"stages": stages, "counters": dict(_counters)}
+
+
+def prometheus_text():
+    """Metrics in the Prometheus text exposition format."""
+    lines = ["# HELP pipeline_stage_duration_seconds Duration of pipeline stages.",
+             "# TYPE pipeline_stage_duration_seconds histogram"]
+    with _lock:
+        for stage, h in sorted(_hist.items()):
+            cumulative = 0
+            for le, n in zip(BUCKETS, h):
+                cumulative += n
+                lines.append(f'pipeline_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            cumulative += h[len(BUCKETS)]
+            lines.append(f'pipeline_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+            lines.append(f'pipeline_stage_duration_seconds_sum{{stage="{stage}"}} {h[-1]}')
+            lines.append(f'pipeline_stage_duration_seconds_count{{stage="{stage}"}} {cumulative}')
+        names = sorted({name for name, _ in _counters})
+        for name in names:
+            lines.append(f"# TYPE pipeline_{name}_total counter")
+            for (n, stage), value in sorted(_counters.items()):
+                if n == name:
+                    label = f'{{stage="{stage}"}}' if stage else ""
+                    lines.append(f"pipeline_{name}_total{label} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Write prometheus_text() atomically (node_exporter textfile collector style)."""
+    with open(path + ".tmp", "w") as f:
+        f.write(prometheus_text())
+    os.replace(path + ".tmp", path)
+
+
+def serve_prometheus(port=9108, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentiles(values):
+    """{"p50", "p95", "p99"} of values as floats; {} when there are none."""
+    import numpy as np
+    if not len(values):
+        return {}
+    return dict(zip(["p50", "p95", "p99"], map(float, np.percentile(values, [50, 95, 99]))))
+
+
+def cycle_percentiles(history, last=None):
+    """p50/p95/p99 of `cycle_seconds` over a service's per-cycle stats (all, or the last N)."""
+    history = history[-last:] if last else history
+    return percentiles([h["cycle_seconds"] for h in history])
+
+
+def summarize(paths, stages=None):
+    """Per-stage count / p50 / p95 / p99 / mean / error count from JSON span logs."""
+    import numpy as np
+    durations, errors, totals = defaultdict(list), defaultdict(int), defaultdict(lambda: defaultdict(float))
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                stage = rec.get("stage")
+                if stage is None or (stages and stage not in stages):
+                    continue
+                durations[stage].append(rec["seconds"])
+                errors[stage] += bool(rec.get("error"))
+                for key in ("rows", "bytes", "cache_hits", "cache_misses"):
+                    if isinstance(rec.get(key), (int, float)):
+                        totals[stage][key] += rec[key]
+    rows = []
+    for stage, values in sorted(durations.items()):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        rows.append({"stage": stage, "count": len(values), "p50": p50, "p95": p95, "p99": p99,
+                     "mean": float(np.mean(values)), "errors": errors[stage], **totals[stage]})
+    return rows
+
+
+if os.environ.get("PIPELINE_METRICS") or os.environ.get("PIPELINE_METRICS_LOG"):
+    enable(os.environ.get("PIPELINE_METRICS_LOG") or None)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "summarize":
+        print("usage: python src/telemetry.py summarize <log.jsonl> [more logs...] [--stage name ...]")
+        sys.exit(2)
+    args = sys.argv[2:]
+    stages = {args[i + 1] for i, a in enumerate(args) if a == "--stage" and i + 1 < len(args)}
+    paths = [a for i, a in enumerate(args) if a != "--stage" and (i == 0 or args[i - 1] != "--stage")]
+    print(f"{'stage':<20} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'errors':>7} {'rows':>10}")
+    for r in summarize(paths, stages or None):
+        print(f"{r['stage']:<20} {r['count']:>7} {r['p50']*1000:9.2f} {r['p95']*1000:9.2f} {r['p99']*1000:9.2f} "
+              f"{r['mean']*1000:9.2f} {r['errors']:>7} {int(r.get('rows', 0)):>10}")
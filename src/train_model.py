@@ -1,54 +1,410 @@
+import os
+import json
+import time
 import pandas as pd
 import numpy as np
-import joblib
+import resource
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import accuracy_score, precision_score
+from sklearn.metrics import accuracy_score, precision_score, log_loss
 import lightgbm as lgb
-from db import engine
+from db import read_range, read_prices_since, iter_range
+from native_model import save_native
+from model_registry import POOLED_SYMBOL
+from pooled_model import LOOKBACK as POOLED_LOOKBACK
+from features import (MODEL_FEATURES, POOLED_FEATURES, FEATURE_VERSION, FeatureCache, compute_features,
+                      compute_pooled_features, iter_features)
 
-def load_feature_table(symbol):
-    q = f"SELECT * FROM prices WHERE symbol='{symbol}' ORDER BY ts"
-    df = pd.read_sql(q, engine)
-    df = df.sort_values('ts').reset_index(drop=True)
-    return df
+def load_feature_table(symbol, start=None, end=None):
+    df = read_range(symbol, start, end)
+    return df.reset_index(drop=True)
+
+feature_cache = FeatureCache()
+
+def load_features(symbol):
+    # prices + features from the on-disk cache; only rows newer than the cache are read and computed
+    return feature_cache.get(symbol, read_prices_since)
 
 def prepare_ml_df(df):
-    # simple features using closing price
-    df['return_1'] = df['close'].pct_change()
-    df['ma_5'] = df['close'].rolling(5).mean()
-    df['ma_20'] = df['close'].rolling(20).mean()
-    df['rsi_14'] = df['close'].rolling(14).apply(lambda x: (x.diff().gt(0).sum())/len(x))  # placeholder
-    df = df.dropna().reset_index(drop=True)
+    # simple features using closing price (shared definitions in features.py)
+    if not set(MODEL_FEATURES).issubset(df.columns):
+        df = compute_features(df, MODEL_FEATURES)
+    df = df.dropna(subset=MODEL_FEATURES).reset_index(drop=True)
     # target: next-day return
     df['future_ret_1d'] = df['close'].shift(-1)/df['close'] - 1
     df = df.dropna()
     df['y'] = (df['future_ret_1d'] > 0.005).astype(int)  # 0.5% threshold
     return df
 
-def train_symbol(symbol):
-    df = load_feature_table(symbol)
-    df = prepare_ml_df(df)
-    X = df[['return_1','ma_5','ma_20','rsi_14']].values
-    y = df['y'].values
+def load_training_arrays(symbol, start=None, end=None, chunk_rows=50_000, threshold=0.005):
+    """
+    Out-of-core equivalent of prepare_ml_df(load_features(symbol)) for large histories.
+    Streams (ts, close) in chunks from a server-side cursor, computes MODEL_FEATURES with
+    the window tail carried across chunks, and keeps only compact arrays:
+    ts (datetime64), X (float32, rows x features), y (int8). The label of a chunk's last
+    row waits for the first close of the next chunk.
+    """
+    ts_parts, X_parts, y_parts = [], [], []
+    held = None  # (ts, X, close) of the last valid row, waiting for its next close
+    chunks = iter_range(symbol, start, end, columns=["close"], chunk_rows=chunk_rows)
+    for part in iter_features(chunks, MODEL_FEATURES):
+        feats = part[MODEL_FEATURES].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(feats).any(axis=1)
+        ts = part['ts'].to_numpy(dtype="datetime64[ns]")[valid]  # UTC, 8 bytes per row
+        X = feats[valid].astype(np.float32)
+        close = part['close'].to_numpy(dtype=np.float64)[valid]
+        if held is not None:
+            ts, X, close = (np.concatenate([h, a]) for h, a in zip(held, (ts, X, close)))
+        if len(close) == 0:
+            continue
+        ret = close[1:] / close[:-1] - 1
+        ts_parts.append(ts[:-1])
+        X_parts.append(X[:-1])
+        y_parts.append((ret > threshold).astype(np.int8))
+        held = (ts[-1:], X[-1:], close[-1:])
+    if not X_parts:
+        return np.array([], dtype="datetime64[ns]"), np.empty((0, len(MODEL_FEATURES)), np.float32), np.array([], np.int8)
+    return np.concatenate(ts_parts), np.concatenate(X_parts), np.concatenate(y_parts)
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+PARAMS = {
+    "objective": "binary",
+    "learning_rate": 0.1,
+    "num_leaves": 31,
+    "verbose": -1,
+}
+MAX_ROUNDS = 500
+EARLY_STOPPING = 50
+VALID_FRAC = 0.2  # tail of each CV fold's training rows used for early stopping
+
+def _split_valid(train_idx, valid_frac=VALID_FRAC):
+    """(fit rows, early-stopping rows): the last valid_frac of a fold's training rows validate."""
+    n_valid = max(1, int(len(train_idx) * valid_frac))
+    return train_idx[:-n_valid], train_idx[-n_valid:]
+
+def train_symbol(symbol, num_threads=0, n_splits=5, model_dir="models", streaming=False):
+    """
+    Time-series CV + full refit for one symbol.
+    streaming=True loads training rows with load_training_arrays (chunked, float32)
+    instead of the feature cache.
+    The feature matrix is binned once into an lgb.Dataset; every fold and the refit train
+    on it or a subset() of it (shared bin mappers, no rebinning). Each fold early-stops on
+    the last VALID_FRAC of its training rows and is scored on its untouched test slice;
+    the median best iteration is the refit's n_estimators.
+    Returns a dict of timings and CV metrics.
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    if streaming:
+        ts, X, y = load_training_arrays(symbol)
+        cutoff = pd.Timestamp(ts[-1], tz="UTC")
+    else:
+        df = load_features(symbol)
+        df = prepare_ml_df(df)
+        X = df[MODEL_FEATURES].values
+        y = df['y'].values
+        cutoff = df['ts'].iloc[-1]
+    timings["load"] = time.perf_counter() - t0
+
+    params = dict(PARAMS, num_threads=num_threads)
+    t0 = time.perf_counter()
+    full = lgb.Dataset(X, y, params=params, free_raw_data=False).construct()
+    timings["bin"] = time.perf_counter() - t0
+
     # time-series CV
-    tscv = TimeSeriesSplit(n_splits=5)
-    models=[]
+    t0 = time.perf_counter()
+    tscv = TimeSeriesSplit(n_splits=n_splits)
+    accs, precs, best_iters = [], [], []
     for train_idx, test_idx in tscv.split(X):
-        Xtr, Xte = X[train_idx], X[test_idx]
-        ytr, yte = y[train_idx], y[test_idx]
-        lgbm = lgb.LGBMClassifier(n_estimators=200)
-        lgbm.fit(Xtr, ytr)
-        preds = lgbm.predict(Xte)
-        print("acc", accuracy_score(yte, preds), "prec", precision_score(yte, preds, zero_division=0))
-        models.append(lgbm)
-    # save final model (retrain on full data)
-    final = lgb.LGBMClassifier(n_estimators=300)
-    final.fit(X, y)
-    joblib.dump(final, f"models/{symbol}_lgbm.pkl")
+        fit_idx, valid_idx = _split_valid(train_idx)
+        dtrain = full.subset(fit_idx)
+        dvalid = full.subset(valid_idx)
+        booster = lgb.train(params, dtrain, num_boost_round=MAX_ROUNDS, valid_sets=[dvalid],
+                            callbacks=[lgb.early_stopping(EARLY_STOPPING, verbose=False)])
+        best = booster.best_iteration or MAX_ROUNDS
+        preds = (booster.predict(X[test_idx], num_iteration=best) > 0.5).astype(int)
+        yte = y[test_idx]
+        accs.append(accuracy_score(yte, preds))
+        precs.append(precision_score(yte, preds, zero_division=0))
+        best_iters.append(best)
+        print(symbol, "acc", accs[-1], "prec", precs[-1], "best_iter", best)
+    timings["cv"] = time.perf_counter() - t0
+
+    # save final model (retrain on the full binned Dataset, tree count from early stopping).
+    # saved as the Booster's native text model for predict_realtime / ModelRegistry.
+    t0 = time.perf_counter()
+    n_estimators = max(1, int(np.median(best_iters)))
+    final = lgb.train(params, full, num_boost_round=n_estimators)
+    save_model(final, symbol, {
+        "mode": "full",
+        "cutoff_ts": str(cutoff),
+        "rows": len(y),
+        "n_estimators": n_estimators,
+        "metrics": {"cv_acc": float(np.mean(accs)), "cv_prec": float(np.mean(precs))},
+    }, model_dir)
+    timings["refit"] = time.perf_counter() - t0
     print("model saved for", symbol)
 
+    return {
+        "symbol": symbol,
+        "rows": len(y),
+        "n_estimators": n_estimators,
+        "cv_acc": float(np.mean(accs)),
+        "cv_prec": float(np.mean(precs)),
+        **{f"t_{k}": v for k, v in timings.items()},
+        "t_total": sum(timings.values()),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def model_path(symbol, model_dir="models"):
+    # LightGBM's native text model: lgb.Booster(model_file=...) or NativeModel read it back
+    return os.path.join(model_dir, f"{symbol}_lgbm.txt")
+
+def meta_path(symbol, model_dir="models"):
+    # training metadata lives next to the model: models/<SYMBOL>_lgbm.json
+    return os.path.join(model_dir, f"{symbol}_lgbm.json")
+
+def load_meta(symbol, model_dir="models"):
+    path = meta_path(symbol, model_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_model(booster, symbol, meta, model_dir="models", features=MODEL_FEATURES):
+    """
+    Write the Booster as a native LightGBM text model and its metadata, each atomically
+    (tmp file + rename) so readers never see a partial model. A pickle left by an older
+    version is removed, so nothing loads the stale model instead.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    meta = dict(meta, symbol=symbol, feature_version=FEATURE_VERSION,
+                features=list(features), trained_at=pd.Timestamp.now(tz="UTC").isoformat())
+    save_native(booster, model_path(symbol, model_dir))
+    stale = os.path.join(model_dir, f"{symbol}_lgbm.pkl")
+    if os.path.exists(stale):
+        os.remove(stale)
+    with open(meta_path(symbol, model_dir) + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path(symbol, model_dir) + ".tmp", meta_path(symbol, model_dir))
+
+def load_pooled_panel(symbols):
+    """
+    Stacked training panel of all symbols for the pooled model, ordered by (ts, symbol):
+    prepare_ml_df rows of each symbol + POOLED_FEATURES + symbol_code (the index of the
+    symbol in sorted(symbols), a feature only for categorical models).
+    """
+    frames = []
+    for code, sym in enumerate(sorted(symbols)):
+        df = prepare_ml_df(compute_pooled_features(load_features(sym)))
+        df['symbol'] = sym
+        df['symbol_code'] = code
+        frames.append(df)
+    panel = pd.concat(frames, ignore_index=True)
+    return panel.sort_values(['ts', 'symbol_code'], kind='stable').reset_index(drop=True)
+
+def train_pooled(symbols, num_threads=0, n_splits=5, model_dir="models", categorical=False):
+    """
+    One LightGBM model for all symbols (models/_POOLED_lgbm.*), instead of one per symbol.
+    Same procedure as train_symbol on the stacked panel; CV folds, and the early-stopping
+    tail of each fold's training rows, split on time (whole timestamps), so every fold
+    validates and tests all symbols on bars after its training rows.
+    categorical=True adds the symbol as a LightGBM categorical feature; NativeModel cannot
+    evaluate its categorical splits, so the registry serves it through lightgbm's Booster.
+    Returns a dict of timings and CV metrics, including out-of-fold accuracy per symbol.
+    """
+    symbols = sorted(s.upper() for s in symbols)
+    features = POOLED_FEATURES + (['symbol_code'] if categorical else [])
+    timings = {}
+    t0 = time.perf_counter()
+    panel = load_pooled_panel(symbols)
+    X = panel[features].values
+    y = panel['y'].values
+    codes = panel['symbol_code'].values
+    times = panel['ts'].values
+    timings["load"] = time.perf_counter() - t0
+
+    params = dict(PARAMS, num_threads=num_threads)
+    categorical_feature = [len(POOLED_FEATURES)] if categorical else "auto"
+    t0 = time.perf_counter()
+    full = lgb.Dataset(X, y, params=params, categorical_feature=categorical_feature, free_raw_data=False).construct()
+    timings["bin"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    stamps = np.unique(times)
+    tscv = TimeSeriesSplit(n_splits=n_splits)
+    accs, precs, best_iters = [], [], []
+    hits = np.zeros(len(symbols))
+    tested = np.zeros(len(symbols))
+    for train_t, test_t in tscv.split(stamps):
+        fit_t, valid_t = _split_valid(train_t)
+        fit_idx = np.flatnonzero(times <= stamps[fit_t[-1]])
+        valid_idx = np.flatnonzero((times >= stamps[valid_t[0]]) & (times <= stamps[valid_t[-1]]))
+        test_idx = np.flatnonzero((times >= stamps[test_t[0]]) & (times <= stamps[test_t[-1]]))
+        booster = lgb.train(params, full.subset(fit_idx), num_boost_round=MAX_ROUNDS,
+                            valid_sets=[full.subset(valid_idx)],
+                            callbacks=[lgb.early_stopping(EARLY_STOPPING, verbose=False)])
+        best = booster.best_iteration or MAX_ROUNDS
+        preds = (booster.predict(X[test_idx], num_iteration=best) > 0.5).astype(int)
+        yte = y[test_idx]
+        accs.append(accuracy_score(yte, preds))
+        precs.append(precision_score(yte, preds, zero_division=0))
+        best_iters.append(best)
+        np.add.at(hits, codes[test_idx], preds == yte)
+        np.add.at(tested, codes[test_idx], 1)
+        print(POOLED_SYMBOL, "acc", accs[-1], "prec", precs[-1], "best_iter", best)
+    timings["cv"] = time.perf_counter() - t0
+    acc_by_symbol = {sym: float(hits[i] / tested[i]) for i, sym in enumerate(symbols) if tested[i]}
+
+    t0 = time.perf_counter()
+    n_estimators = max(1, int(np.median(best_iters)))
+    final = lgb.train(params, full, num_boost_round=n_estimators)
+    save_model(final, POOLED_SYMBOL, {
+        "mode": "pooled",
+        "cutoff_ts": str(panel['ts'].iloc[-1]),
+        "rows": len(y),
+        "n_estimators": n_estimators,
+        "symbols": symbols,
+        "lookback": POOLED_LOOKBACK,
+        "metrics": {"cv_acc": float(np.mean(accs)), "cv_prec": float(np.mean(precs)), "cv_acc_by_symbol": acc_by_symbol},
+    }, model_dir, features=features)
+    timings["refit"] = time.perf_counter() - t0
+    print(f"pooled model saved for {len(symbols)} symbols")
+
+    return {
+        "symbol": POOLED_SYMBOL,
+        "rows": len(y),
+        "n_estimators": n_estimators,
+        "cv_acc": float(np.mean(accs)),
+        "cv_prec": float(np.mean(precs)),
+        "acc_by_symbol": acc_by_symbol,
+        **{f"t_{k}": v for k, v in timings.items()},
+        "t_total": sum(timings.values()),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def _evaluate(booster, X, y):
+    proba = booster.predict(X)
+    return {
+        "logloss": float(log_loss(y, proba, labels=[0, 1])),
+        "acc": float(accuracy_score(y, (proba > 0.5).astype(int))),
+    }
+
+def refresh_symbol(symbol, mode="continue", extra_rounds=50, window_rows=2000, valid_frac=0.3,
+                   min_new_rows=20, tolerance=0.0, model_dir="models"):
+    """
+    Incremental refresh instead of a full retrain.
+    - reads the model's training cutoff from its metadata; falls back to train_symbol
+      when there is no model/metadata or the feature version changed
+    - rows after the cutoff are split into train / validation (last valid_frac)
+    - mode="continue": keep boosting the existing booster on the new training rows
+      mode="window": retrain on the last window_rows rows up to the validation slice
+    - the candidate is promoted only if its validation logloss does not exceed the
+      current model's by more than `tolerance`
+    Returns a dict describing what happened.
+    """
+    meta = load_meta(symbol, model_dir)
+    if meta is None or meta.get("feature_version") != FEATURE_VERSION or not os.path.exists(model_path(symbol, model_dir)):
+        report = train_symbol(symbol, model_dir=model_dir)
+        return {"symbol": symbol, "action": "full_retrain", **report}
+
+    df = prepare_ml_df(load_features(symbol))
+    cutoff = pd.Timestamp(meta["cutoff_ts"])
+    new = df[df['ts'] > cutoff]
+    if len(new) < min_new_rows:
+        return {"symbol": symbol, "action": "skipped", "new_rows": len(new)}
+
+    n_valid = max(1, int(len(new) * valid_frac))
+    valid = new.iloc[-n_valid:]
+    train_new = new.iloc[:-n_valid]
+    X_valid, y_valid = valid[MODEL_FEATURES].values, valid['y'].values
+
+    current = lgb.Booster(model_file=model_path(symbol, model_dir))
+    if mode == "continue":
+        if train_new.empty:
+            return {"symbol": symbol, "action": "skipped", "new_rows": len(new)}
+        dtrain = lgb.Dataset(train_new[MODEL_FEATURES].values, train_new['y'].values, params=PARAMS)
+        candidate = lgb.train(PARAMS, dtrain, num_boost_round=extra_rounds, init_model=current)
+        train_rows = len(train_new)
+    elif mode == "window":
+        window = df[df['ts'] < valid['ts'].iloc[0]].tail(window_rows)
+        dtrain = lgb.Dataset(window[MODEL_FEATURES].values, window['y'].values, params=PARAMS)
+        candidate = lgb.train(PARAMS, dtrain, num_boost_round=current.current_iteration())
+        train_rows = len(window)
+    else:
+        raise ValueError(f"unknown refresh mode: {mode}")
+
+    old_metrics = _evaluate(current, X_valid, y_valid)
+    new_metrics = _evaluate(candidate, X_valid, y_valid)
+    promote = new_metrics["logloss"] <= old_metrics["logloss"] + tolerance
+    result = {
+        "symbol": symbol,
+        "action": f"promoted ({mode})" if promote else f"rejected ({mode})",
+        "new_rows": len(new),
+        "train_rows": train_rows,
+        "valid_rows": n_valid,
+        "current": old_metrics,
+        "candidate": new_metrics,
+    }
+    if promote:
+        # the validation slice is not in the promoted model; the next refresh starts before it
+        save_model(candidate, symbol, {
+            "mode": mode,
+            "cutoff_ts": str(valid['ts'].iloc[0] - pd.Timedelta(microseconds=1)),
+            "rows": meta.get("rows", 0) + train_rows if mode == "continue" else train_rows,
+            "n_estimators": candidate.current_iteration(),
+            "metrics": {"valid_logloss": new_metrics["logloss"], "valid_acc": new_metrics["acc"]},
+            "previous_cutoff_ts": meta["cutoff_ts"],
+        }, model_dir)
+    print(symbol, result["action"], "logloss", old_metrics["logloss"], "->", new_metrics["logloss"])
+    return result
+
+def _init_worker():
+    # forked workers must not share the parent's pooled DB connections
+    from db import engine
+    engine.dispose(close=False)
+
+def split_cores(n_symbols, cores=None, max_workers=None):
+    """(processes, LightGBM threads per process) so that processes * threads ~= cores."""
+    cores = cores or os.cpu_count() or 1
+    workers = max(1, min(n_symbols, max_workers or cores, cores))
+    return workers, max(1, cores // workers)
+
+def train_many(symbols, max_workers=None, cores=None, model_dir="models", streaming=False):
+    """Train symbols in parallel processes; returns a per-symbol timing/metrics report."""
+    os.makedirs(model_dir, exist_ok=True)
+    workers, threads = split_cores(len(symbols), cores, max_workers)
+    print(f"training {len(symbols)} symbols on {workers} processes x {threads} LightGBM threads")
+    t0 = time.perf_counter()
+    rows = []
+    if workers == 1:
+        rows = [train_symbol(s, num_threads=threads, model_dir=model_dir, streaming=streaming) for s in symbols]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(train_symbol, s, threads, 5, model_dir, streaming): s for s in symbols}
+            for fut in as_completed(futures):
+                try:
+                    rows.append(fut.result())
+                except Exception as e:
+                    rows.append({"symbol": futures[fut], "error": str(e)})
+    report = pd.DataFrame(rows).sort_values("symbol").reset_index(drop=True)
+    print(report.to_string(index=False))
+    print(f"wall time {time.perf_counter() - t0:.1f}s")
+    return report
+
 if __name__ == "__main__":
-    import os
-    os.makedirs("models", exist_ok=True)
-    for sym in ["AAPL","MSFT","GOOGL"]:
-        train_symbol(sym)
+    import sys
+    symbols = ["AAPL","MSFT","GOOGL"]
+    if "--refresh" in sys.argv:
+        # incremental: continue boosting from each model's recorded cutoff
+        for sym in symbols:
+            refresh_symbol(sym)
+    elif "--pooled" in sys.argv:
+        # one model for all symbols (models/_POOLED_lgbm.*); --categorical adds the symbol as a feature
+        train_pooled(symbols, categorical="--categorical" in sys.argv)
+    else:
+        # --stream: chunked float32 loading for histories that do not fit the feature cache in RAM
+        train_many(symbols, streaming="--stream" in sys.argv)
@@ -1,33 +1,148 @@
-# polling intraday via Finnhub REST (simple)
-import requests, time, pandas as pd
+# polling intraday via Finnhub REST
+# sync: poll_symbols (one request after another); async: AsyncPoller (pooled, concurrent, rate limited)
+import requests, time, asyncio, random
+import numpy as np
+import pandas as pd
 from config import FINNHUB_API_KEY
 from db import write_prices
+from ratelimit import TokenBucket
+import telemetry
+
+FINNHUB_URL = "https://finnhub.io/api/v1"
 
 def fetch_quote(symbol):
-    url = "https://finnhub.io/api/v1/quote"
+    url = f"{FINNHUB_URL}/quote"
     r = requests.get(url, params={"symbol":symbol, "token": FINNHUB_API_KEY})
     return r.json()
 
+def quote_to_row(symbol, q):
+    # q contains c (current), h, l, o, pc and t (quote time, unix seconds)
+    ts = pd.Timestamp(q["t"], unit="s", tz="UTC") if q.get("t") else pd.Timestamp.now(tz="UTC")
+    return {
+        "symbol": symbol,
+        "ts": ts,
+        "open": q.get("o"),
+        "high": q.get("h"),
+        "low": q.get("l"),
+        "close": q.get("c"),
+        "volume": None,
+        "source": "finnhub_quote"
+    }
+
 def poll_symbols(symbols):
     rows=[]
     for s in symbols:
         q = fetch_quote(s)
-        # q contains c (current), h, l, o, pc
-        rows.append({
-            "symbol": s,
-            "ts": pd.Timestamp.utcnow(),
-            "open": q.get("o"),
-            "high": q.get("h"),
-            "low": q.get("l"),
-            "close": q.get("c"),
-            "volume": None,
-            "source": "finnhub_quote"
-        })
+        rows.append(quote_to_row(s, q))
     df = pd.DataFrame(rows)
     write_prices(df)
 
+
+class RetryableError(Exception):
+    pass
+
+
+class AsyncPoller:
+    """
+    Concurrent quote poller:
+    - one aiohttp session (pooled keep-alive connections) for the poller's lifetime
+    - at most `concurrency` requests in flight, `rate_per_sec` enforced by a token bucket
+    - retries with exponential backoff on network errors, 429 and 5xx
+    - one bulk write_prices call per cycle
+    base_url can point at a local stand-in serving Finnhub's /quote JSON (finnhub_standin.QuoteStandIn).
+    """
+
+    def __init__(self, symbols, token=FINNHUB_API_KEY, base_url=FINNHUB_URL, concurrency=20,
+                 rate_per_sec=30.0, retries=3, backoff=0.5, timeout=10.0, writer=write_prices):
+        self.symbols = list(symbols)
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate_per_sec, capacity=rate_per_sec)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.writer = writer
+        self.session = None
+        self.history = []  # per-cycle stats
+        self._sem = None
+
+    async def __aenter__(self):
+        import aiohttp
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._sem = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _get_quote(self, symbol):
+        import aiohttp
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire_async()
+            try:
+                async with self.session.get(f"{self.base_url}/quote", params={"symbol": symbol, "token": self.token}) as r:
+                    if r.status == 429 or r.status >= 500:
+                        raise RetryableError(f"HTTP {r.status}")
+                    r.raise_for_status()
+                    return await r.json()
+            except (RetryableError, aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random() * 0.1))
+
+    async def _fetch(self, symbol):
+        async with self._sem:
+            t0 = time.perf_counter()
+            try:
+                q = await self._get_quote(symbol)
+                return quote_to_row(symbol, q), time.perf_counter() - t0, None
+            except Exception as e:
+                return None, time.perf_counter() - t0, e
+
+    async def run_cycle(self):
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(self._fetch(s) for s in self.symbols))
+        rows = [r for r, _, err in results if err is None and r is not None]
+        latencies = telemetry.percentiles([lat for _, lat, _ in results])
+        t_fetch = time.perf_counter() - t0
+
+        write_stats = None
+        if rows:
+            df = pd.DataFrame(rows)
+            write_stats = await asyncio.get_running_loop().run_in_executor(None, self.writer, df)
+
+        stats = {
+            "ts": pd.Timestamp.now(tz="UTC"),
+            "symbols": len(self.symbols),
+            "ok": len(rows),
+            "errors": len(self.symbols) - len(rows),
+            "fetch_seconds": t_fetch,
+            "cycle_seconds": time.perf_counter() - t0,
+            **{f"latency_{k}": latencies.get(k, np.nan) for k in ("p50", "p95", "p99")},
+            "write": write_stats,
+        }
+        self.history.append(stats)
+        return stats
+
+    def latency_percentiles(self, last=None):
+        """p50/p95/p99 of cycle durations over the recorded (or last N) cycles."""
+        return telemetry.cycle_percentiles(self.history, last)
+
+    async def run_forever(self, interval=60):
+        while True:
+            stats = await self.run_cycle()
+            print(f"cycle: {stats['ok']}/{stats['symbols']} ok in {stats['cycle_seconds']:.2f}s "
+                  f"(p50 {stats['latency_p50']*1000:.0f}ms, p95 {stats['latency_p95']*1000:.0f}ms)")
+            await asyncio.sleep(max(0.0, interval - stats["cycle_seconds"]))
+
+
+async def main(symbols, interval=60):
+    async with AsyncPoller(symbols) as poller:
+        await poller.run_forever(interval)
+
 if __name__ == "__main__":
     symbols = ["AAPL","MSFT","GOOGL"]
-    while True:
-        poll_symbols(symbols)
-        time.sleep(60)  # every 60s or as allowed by your plan; Finnhub has websocket option for tighter realtime. :contentReference[oaicite:3]{index=3}
+    # every 60s or as allowed by your plan; Finnhub has websocket option for tighter realtime.
+    asyncio.run(main(symbols, interval=60))
@@ -0,0 +1,10 @@
+# tests run from the repo root: `python -m pytest -q`
+# modules are imported both ways the code itself does: `src.<module>` and bare `<module>` (scripts in src/)
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+
+# no database server in tests: db.py gets an in-memory SQLite engine unless one is configured
+os.environ.setdefault("DB_URI", "sqlite://")
@@ -0,0 +1,56 @@
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.explain import Explainer
+from src.features import MODEL_FEATURES, compute_features
+from src.native_model import save_native
+from synthetic_data import generate_symbol
+
+
+def features(bars):
+    return compute_features(generate_symbol(bars, "daily", seed=1), MODEL_FEATURES).set_index("ts")
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    df = features(2_000)
+    y = (df["close"].shift(-1) > df["close"]).astype(int)
+    model = lgb.LGBMClassifier(n_estimators=30, verbose=-1).fit(df[MODEL_FEATURES].values, y.values)
+    save_native(model, str(tmp_path / "AAPL_lgbm.txt"))
+    return str(tmp_path)
+
+
+def test_cached_rows_match_a_fresh_computation(model_dir, tmp_path):
+    ex = Explainer(model_dir=model_dir, cache_dir=str(tmp_path / "shap"))
+    df, grown = features(500), features(520)
+    ex.explain("AAPL", df)
+    ex.explain("AAPL", df)
+    out = ex.explain("AAPL", grown)
+    rows = len(grown[MODEL_FEATURES].dropna())
+    assert ex.rows_computed == rows  # the second call and the first 500 bars came from the cache
+
+    fresh = Explainer(model_dir=model_dir, cache_dir=str(tmp_path / "fresh")).explain("AAPL", grown)
+    pd.testing.assert_frame_equal(out, fresh)
+    booster = lgb.Booster(model_file=ex.model_path("AAPL"))
+    raw = booster.predict(grown[MODEL_FEATURES].dropna().to_numpy(), raw_score=True)
+    np.testing.assert_allclose(out[MODEL_FEATURES + ["base_value"]].sum(axis=1), raw, atol=1e-9)
+    np.testing.assert_allclose(out["raw_score"], raw, atol=1e-9)
+
+    reloaded = Explainer(model_dir=model_dir, cache_dir=str(tmp_path / "shap"))
+    pd.testing.assert_frame_equal(reloaded.explain("AAPL", grown), out)
+    assert reloaded.rows_computed == 0
+
+
+def test_revised_bar_is_recomputed(model_dir, tmp_path):
+    ex = Explainer(model_dir=model_dir, cache_dir=str(tmp_path / "shap"))
+    df = features(500)
+    ex.attribution("AAPL", df)
+    revised = df.copy()
+    revised.iloc[-1, revised.columns.get_indexer(MODEL_FEATURES)] *= 1.01
+    computed = ex.rows_computed
+    got = ex.attribution("AAPL", revised)
+    assert ex.rows_computed == computed + 1, "the revised bar was served from the cache"
+    fresh = Explainer(model_dir=model_dir, cache_dir=str(tmp_path / "fresh")).attribution("AAPL", revised)
+    pd.testing.assert_series_equal(got, fresh)
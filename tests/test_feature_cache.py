@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+
+from features import FeatureCache, MODEL_FEATURES, compute_features
+from synthetic_data import generate_symbol
+
+
+def source_from(df):
+    calls = []
+
+    def load_source(symbol, since):
+        calls.append(since)
+        return df if since is None else df[df["ts"] >= since]  # >= re-reads the last cached bar
+    return load_source, calls
+
+
+def test_unchanged_source_does_not_rewrite(tmp_path):
+    df = generate_symbol(300, "daily", seed=1)
+    cache = FeatureCache(root=str(tmp_path), names=MODEL_FEATURES)
+    load_source, _ = source_from(df)
+    first = cache.get("AAPL", load_source)
+    path = cache.path_for("AAPL")
+    mtime = os.stat(path).st_mtime_ns
+
+    again = cache.get("AAPL", load_source)
+    assert os.stat(path).st_mtime_ns == mtime
+    pd.testing.assert_frame_equal(again, first)
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_corrected_and_new_bars_are_written(tmp_path):
+    df = generate_symbol(300, "daily", seed=2)
+    cache = FeatureCache(root=str(tmp_path), names=MODEL_FEATURES)
+    cache.get("AAPL", source_from(df.iloc[:200])[0])
+
+    corrected = df.copy()
+    corrected.loc[199, "close"] *= 1.01
+    cache.get("AAPL", source_from(corrected.iloc[:200])[0])
+    assert cache.load("AAPL")["close"].iloc[-1] == corrected["close"].iloc[199]
+
+    out = cache.get("AAPL", source_from(corrected)[0])
+    expected = compute_features(corrected.copy(), MODEL_FEATURES)
+    pd.testing.assert_frame_equal(out[MODEL_FEATURES], expected[MODEL_FEATURES], check_dtype=False)
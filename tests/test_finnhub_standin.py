@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pandas as pd
+
+from finnhub_standin import QuoteStandIn, TradeStandIn
+from stream_ticks import TickStream
+from update_intraday import AsyncPoller
+
+
+def test_quote_poller_retries_and_writes_every_symbol():
+    """
+    AsyncPoller against QuoteStandIn with injected 429s and latency: every symbol is written
+    once per cycle with the quote the stand-in served, and every failure was retried.
+    """
+    symbols = [f"SYM{i:03d}" for i in range(50)]
+    cycles = 3
+    written = []
+
+    async def run():
+        server = QuoteStandIn(latency=0.01, fail_every=7, fail_status=429)
+        base_url = await server.start()
+        try:
+            async with AsyncPoller(symbols, token="standin", base_url=base_url, concurrency=10,
+                                   rate_per_sec=500.0, retries=3, backoff=0.01, writer=written.append) as poller:
+                for _ in range(cycles):
+                    stats = await poller.run_cycle()
+                    assert stats["ok"] == len(symbols) and stats["errors"] == 0, stats
+                    df = written[-1]
+                    assert sorted(df["symbol"]) == symbols
+                    served = df["symbol"].map(lambda s: server.last[s]["c"])
+                    assert (df["close"] == served).all(), "written close differs from the quote served"
+        finally:
+            await server.stop()
+        return server
+
+    server = asyncio.run(run())
+    assert len(written) == cycles
+    assert server.failures > 0 and server.requests == len(symbols) * cycles + server.failures
+
+
+def test_tick_stream_under_backpressure_and_drops():
+    """
+    TickStream against TradeStandIn with a tiny bar queue, a slow and sometimes failing writer
+    and dropped connections: the service neither deadlocks nor loses volume (every tick is in
+    a written bar or counted late).
+    """
+    symbols = [f"SYM{i:03d}" for i in range(10)]
+    written, calls = [], [0]
+
+    def slow_writer(df):
+        calls[0] += 1
+        time.sleep(0.05)
+        if calls[0] % 5 == 0:
+            raise ConnectionError("stand-in write failure")
+        written.append(df)
+
+    server = TradeStandIn(messages_per_sec=500, ticks_per_message=4, drop_after=600)
+    url = server.start()
+    # queue of 2 bars and 1s bars with a short grace: the clock closes bars while the queue is full
+    stream = TickStream(symbols, token="standin", url=url, interval=1, grace=0.2, queue_size=2,
+                        batch_size=8, flush_every=0.2, reconnect_delay=0.1, writer=slow_writer).start()
+    time.sleep(2.0)
+    server.pause()
+    deadline = time.time() + 10
+    while stream.metrics["ticks"] < server.sent_ticks and time.time() < deadline:
+        time.sleep(0.1)
+    stream.stop()
+    server.stop()
+
+    assert not any(t.is_alive() for t in stream._threads), "TickStream did not shut down (deadlock)"
+    assert server.connections >= 2
+    bars = pd.concat(written, ignore_index=True)
+    stats = stream.stats()
+    assert stats["ticks"] == server.sent_ticks
+    assert not bars.duplicated(["symbol", "ts"]).any(), "a bar was written twice"
+    assert stats["bars_dropped"] == 0 and stats["bars_written"] == len(bars)
+    assert bars["volume"].sum() + stats["late_ticks"] == server.sent_ticks, "volume lost"
@@ -0,0 +1,111 @@
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+import src.predict_realtime as predict_realtime
+import train_model
+from src.features import MODEL_FEATURES, compute_features
+from src.fetch_live import FixtureSource, set_source, clear_cache
+from src.model_registry import ModelRegistry, MODEL_DIR
+from src.native_model import save_native
+from src.scoring_service import ScoringService
+from synthetic_data import generate_symbol, generate_universe, to_yfinance
+
+SYMBOLS = ["AAPL", "MSFT"]
+
+
+@pytest.fixture
+def live_bars(monkeypatch):
+    """Replay 60 synthetic 1m bars per symbol as the live source."""
+    frames = {s: to_yfinance(generate_symbol(60, "minute", seed=i, start="2026-01-05 14:30"))
+              for i, s in enumerate(SYMBOLS)}
+    set_source(FixtureSource(frames))
+    yield frames
+    set_source(None)
+
+
+def trained_model_dir(tmp_path):
+    df = compute_features(generate_symbol(3_000, "daily", seed=7), MODEL_FEATURES)
+    y = (df["close"].shift(-1) > df["close"]).astype(int)
+    model = lgb.LGBMClassifier(n_estimators=50, verbose=-1).fit(df[MODEL_FEATURES].values, y.values)
+    for sym in SYMBOLS:
+        save_native(model, str(tmp_path / f"{sym}_lgbm.txt"))
+    return str(tmp_path)
+
+
+@pytest.fixture(params=["trained", "shipped"])
+def registry(request, tmp_path, monkeypatch):
+    if request.param == "shipped":
+        if not all(os.path.exists(os.path.join(MODEL_DIR, f"{s}_lgbm.txt")) for s in SYMBOLS):
+            pytest.skip("no shipped models")
+        model_dir = MODEL_DIR
+    else:
+        model_dir = trained_model_dir(tmp_path)
+    registry = ModelRegistry(model_dir=model_dir, pooled="off")
+    monkeypatch.setattr(predict_realtime, "registry", registry)
+    return registry
+
+
+def expected(registry, frames, sym):
+    """The model's answer for MODEL_FEATURES of the last bar, computed over the whole replayed history."""
+    df = compute_features(frames[sym].rename(columns=str.lower).reset_index(drop=True), MODEL_FEATURES)
+    proba = registry.get(sym).predict_proba(df[MODEL_FEATURES].to_numpy(dtype=float)[-1:])[0]
+    return ("BUY" if proba.argmax() == 1 else "SELL"), round(float(proba.max()), 3), float(proba[1])
+
+
+def test_live_paths_agree_on_model_features(live_bars, registry):
+    many, _ = predict_realtime.predict_many(SYMBOLS)
+    rows = []
+    ScoringService(SYMBOLS, None, registry=registry, writer=lambda engine, batch: rows.extend(batch) or len(batch)).run_cycle()
+    scored = {r["symbol"]: r for r in rows}
+    for sym in SYMBOLS:
+        action, confidence, prob_up = expected(registry, live_bars, sym)
+        assert predict_realtime.predict_live(sym) == (action, confidence)
+        assert many[sym] == (action, confidence)
+        assert scored[sym]["label"] == action
+        assert scored[sym]["prob_up"] == pytest.approx(prob_up)
+
+
+def test_too_few_bars_is_missing(live_bars, registry):
+    set_source(FixtureSource({s: f.tail(10) for s, f in live_bars.items()}))
+    clear_cache()
+    many, _ = predict_realtime.predict_many(SYMBOLS)
+    stats = ScoringService(SYMBOLS, None, registry=registry, writer=lambda engine, batch: len(batch)).run_cycle()
+    for sym in SYMBOLS:
+        assert predict_realtime.predict_live(sym) == (None, None)
+        assert many[sym] == (None, None)
+    assert stats["scored"] == 0 and sorted(stats["missing"]) == SYMBOLS
+
+
+def test_live_paths_agree_with_the_pooled_model(tmp_path, monkeypatch):
+    """Stored bars replayed as live data score like the pooled model on each symbol's full history."""
+    universe = generate_universe(4, 1_500, "daily", seed=17)
+    bars = {s: g.reset_index(drop=True) for s, g in universe.groupby("symbol")}
+    symbols = sorted(bars)
+    monkeypatch.setattr(train_model, "load_features",
+                        lambda symbol: compute_features(bars[symbol].copy(), MODEL_FEATURES))
+    train_model.train_pooled(symbols, n_splits=3, model_dir=str(tmp_path))
+
+    frames = {s: b.set_index("ts")[["open", "high", "low", "close", "volume"]].rename(columns=str.title)
+              for s, b in bars.items()}
+    set_source(FixtureSource(frames))
+    registry = ModelRegistry(model_dir=str(tmp_path), pooled="prefer")
+    monkeypatch.setattr(predict_realtime, "registry", registry)
+    try:
+        many, _ = predict_realtime.predict_many(symbols)
+        rows = []
+        ScoringService(symbols, None, registry=registry, writer=lambda engine, batch: rows.extend(batch) or len(batch)).run_cycle()
+        scored = {r["symbol"]: r for r in rows}
+        for sym in symbols:
+            pooled = registry.get(sym).pooled
+            X = pooled.feature_matrix(sym, bars[sym])
+            proba = pooled.model.predict_proba(X)[-1]
+            action, confidence = ("BUY" if proba.argmax() == 1 else "SELL"), round(float(proba.max()), 3)
+            assert predict_realtime.predict_live(sym) == (action, confidence)
+            assert many[sym] == (action, confidence)
+            assert scored[sym]["label"] == action
+            assert scored[sym]["prob_up"] == pytest.approx(float(proba[1]))
+    finally:
+        set_source(None)
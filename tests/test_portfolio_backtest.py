@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import strategy_returns, backtest_grid
+from portfolio_backtest import combine
+from synthetic_data import generate_symbol
+
+
+def frame(n=12):
+    return pd.DataFrame({"open": np.linspace(100, 111, n), "close": np.linspace(100.5, 111.5, n)})
+
+
+def test_trade_is_spread_over_its_holding_bars():
+    df = frame()
+    probs = np.zeros(len(df))
+    probs[2] = 1.0
+    per_bar, held = strategy_returns(df, probs, threshold=0.5, holding_period=5, cost=0.001)
+    assert np.flatnonzero(held).tolist() == [3, 4, 5, 6, 7]
+    assert np.flatnonzero(per_bar).tolist() == [3, 4, 5, 6, 7]  # nothing booked on the signal bar
+    trade = df["close"][7] / df["open"][3] - 1
+    assert np.prod(1 + per_bar) - 1 == pytest.approx(trade - 0.001)
+
+
+@pytest.mark.parametrize("hold", [1, 3, 5])
+def test_compounds_to_backtest_grid(hold):
+    df = generate_symbol(500, "daily", seed=3)
+    probs = np.random.default_rng(hold).random(len(df))
+    per_bar, held = strategy_returns(df, probs, threshold=0.7, holding_period=hold, cost=0.0005)
+    stats = backtest_grid(df, probs, (0.7,), (hold,), (0.0005,)).iloc[0]
+    assert np.prod(1 + per_bar) - 1 == pytest.approx(stats["total_return"])
+    assert held.sum() == stats["trades"] * hold
+
+
+def test_active_sizing_counts_open_trades_on_every_held_bar():
+    idx = pd.date_range("2024-01-01", periods=6, freq="D", tz="UTC")
+    results = {
+        "A": {"returns": pd.Series([0, 0.01, 0.02, 0, 0, 0], index=idx), "positions": pd.Series([0, 1, 1, 0, 0, 0], index=idx)},
+        "B": {"returns": pd.Series([0, 0, 0.04, 0.01, 0, 0], index=idx), "positions": pd.Series([0, 0, 1, 1, 0, 0], index=idx)},
+    }
+    port = combine(results, sizing="active")
+    assert port.tolist() == pytest.approx([0, 0.01, 0.03, 0.01, 0, 0])
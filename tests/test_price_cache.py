@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from src.price_cache import PriceWindowCache
+from storage import ParquetStore
+from synthetic_data import generate_symbol
+
+
+class CountingStore:
+    """A PriceStore that records the (start, end) of every read."""
+
+    def __init__(self, store):
+        self.store = store
+        self.reads = []
+
+    def read_range(self, symbols, start=None, end=None, columns=None):
+        self.reads.append((start, end))
+        return self.store.read_range(symbols, start, end, columns)
+
+
+@pytest.fixture
+def store(tmp_path):
+    bars = generate_symbol(400, "daily", seed=5, start=pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=400))
+    bars["symbol"] = "AAPL"
+    parquet = ParquetStore(str(tmp_path))
+    parquet.write_prices(bars.iloc[:-1])
+    return CountingStore(parquet), bars
+
+
+def window(store, days):
+    since = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)).normalize()
+    df = store.store.read_range("AAPL", start=since)
+    return df.drop(columns="symbol").set_index("ts")
+
+
+def test_delta_and_gap_reads_through_the_store(store):
+    store, bars = store
+    now = [0.0]
+    cache = PriceWindowCache(store, refresh_every=5.0, clock=lambda: now[0])
+
+    first = cache.get("AAPL", 100)
+    pd.testing.assert_frame_equal(first, window(store, 100), check_freq=False)
+    cache.get("AAPL", 100)
+    assert cache.stats()["hits"] == 1 and len(store.reads) == 1
+
+    # a correction to the last stored bar and a new bar, picked up by the delta read
+    corrected = bars.iloc[-2:].copy()
+    corrected.iloc[0, corrected.columns.get_loc("close")] += 1.0
+    store.store.write_prices(corrected)
+    now[0] = 10.0
+    delta = cache.get("AAPL", 100)
+    assert store.reads[-1] == (first.index[-1], None)
+    pd.testing.assert_frame_equal(delta, window(store, 100), check_freq=False)
+
+    longer = cache.get("AAPL", 300)
+    assert store.reads[-1][1] is not None  # only the older gap
+    pd.testing.assert_frame_equal(longer, window(store, 300), check_freq=False)
+    assert cache.stats()["deltas"] == 1 and cache.stats()["misses"] == 2
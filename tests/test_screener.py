@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from insights import fetch_and_prepare, add_indicators, quick_insights
+from screener import CONDITIONS, UniverseScreener
+from synthetic_data import generate_universe
+
+BARS = 300
+
+
+@pytest.fixture(scope="module")
+def universe():
+    universe = generate_universe(40, BARS + 20, "daily", seed=5)
+    # staggered listings: symbol i starts i % 30 bars late
+    universe = universe[universe.groupby("symbol").cumcount() >= universe["symbol"].str[3:].astype(int) % 30]
+    last_ts = np.sort(universe["ts"].unique())[BARS - 1]
+    return universe[universe["ts"] <= last_ts], universe[universe["ts"] > last_ts]
+
+
+def expected_conditions(history):
+    """{symbol: triggered condition names} from the per-symbol quick_insights chain."""
+    out = {}
+    for sym, g in history.groupby("symbol"):
+        lines = quick_insights(add_indicators(fetch_and_prepare(g.set_index("ts")[["close"]])))
+        out[sym] = {name for name, msg in CONDITIONS.items() if msg in lines}
+    return out
+
+
+def conditions(table, sym):
+    return set(table.loc[table["symbol"] == sym, "condition"])
+
+
+def test_matches_quick_insights(universe):
+    history, _ = universe
+    screener = UniverseScreener()
+    screener.load(history)
+    table = screener.screen()
+    expected = expected_conditions(history)
+    assert any(expected.values()), "no condition triggered: the check would be vacuous"
+    for sym, names in expected.items():
+        assert conditions(table, sym) == names, sym
+
+
+def test_append_matches_a_full_reload(universe):
+    history, fresh = universe
+    screener = UniverseScreener()
+    screener.load(history)
+    for _, bar in fresh.groupby("ts"):
+        screener.append(bar)
+    reloaded = UniverseScreener()
+    reloaded.load(pd.concat([history, fresh]))
+    table = screener.screen()
+    pd.testing.assert_frame_equal(table, reloaded.screen())
+    for sym, names in expected_conditions(pd.concat([history, fresh])).items():
+        assert conditions(table, sym) == names, sym
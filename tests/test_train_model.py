@@ -0,0 +1,69 @@
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+import train_model
+from features import MODEL_FEATURES, compute_features
+from src.model_registry import ModelRegistry, load_model_file
+from src.native_model import NativeModel, BoosterModel
+from synthetic_data import generate_symbol
+
+
+@pytest.fixture
+def history(monkeypatch):
+    """Synthetic daily bars as each symbol's feature history; bars[symbol] can be grown between calls."""
+    bars = {s: generate_symbol(1_500, "daily", seed=i) for i, s in enumerate(["AAPL", "MSFT"])}
+    monkeypatch.setattr(train_model, "load_features",
+                        lambda symbol: compute_features(bars[symbol].copy(), MODEL_FEATURES))
+    return bars
+
+
+def test_symbol_model_is_a_native_booster(history, tmp_path):
+    open(tmp_path / "AAPL_lgbm.pkl", "wb").close()  # stale pickle from an older version
+    train_model.train_symbol("AAPL", n_splits=3, model_dir=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["AAPL_lgbm.json", "AAPL_lgbm.txt"]
+
+    X = compute_features(history["AAPL"].copy(), MODEL_FEATURES)[MODEL_FEATURES].dropna().to_numpy()
+    model = ModelRegistry(model_dir=str(tmp_path), pooled="off").get("AAPL")
+    assert isinstance(model, NativeModel)
+    booster = lgb.Booster(model_file=train_model.model_path("AAPL", str(tmp_path)))
+    np.testing.assert_allclose(model.predict_proba(X)[:, 1], booster.predict(X))
+
+
+@pytest.mark.parametrize("mode", ["continue", "window"])
+def test_refresh_from_the_booster(history, tmp_path, mode):
+    full = history["AAPL"]
+    history["AAPL"] = full.iloc[:1_200]
+    train_model.train_symbol("AAPL", n_splits=3, model_dir=str(tmp_path))
+    before = lgb.Booster(model_file=train_model.model_path("AAPL", str(tmp_path))).current_iteration()
+
+    history["AAPL"] = full
+    result = train_model.refresh_symbol("AAPL", mode=mode, extra_rounds=10, tolerance=1.0, model_dir=str(tmp_path))
+    assert result["action"] == f"promoted ({mode})"
+    after = lgb.Booster(model_file=train_model.model_path("AAPL", str(tmp_path))).current_iteration()
+    assert after == (before + 10 if mode == "continue" else before)
+    assert train_model.load_meta("AAPL", str(tmp_path))["n_estimators"] == after
+
+
+def test_categorical_pooled_model_is_served(history, tmp_path):
+    train_model.train_pooled(["AAPL", "MSFT"], n_splits=3, model_dir=str(tmp_path), categorical=True)
+    assert not os.path.exists(tmp_path / "_POOLED_lgbm.pkl")
+    view = ModelRegistry(model_dir=str(tmp_path), pooled="prefer").get("AAPL")
+    bars = history["AAPL"].tail(view.lookback)
+    booster = lgb.Booster(model_file=str(tmp_path / "_POOLED_lgbm.txt"))
+    expected = booster.predict(view.pooled.feature_matrix("AAPL", bars))
+    np.testing.assert_allclose(view.predict_proba(bars)[:, 1], expected)
+
+
+def test_categorical_splits_load_as_booster(tmp_path):
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.normal(size=2_000), rng.integers(0, 6, 2_000)])
+    y = np.isin(X[:, 1], [1, 4]).astype(int)
+    booster = lgb.train({"objective": "binary", "verbose": -1}, lgb.Dataset(X, y, categorical_feature=[1]), 20)
+    path = str(tmp_path / "CAT_lgbm.txt")
+    booster.save_model(path)
+    model = load_model_file(path)
+    assert isinstance(model, BoosterModel)
+    np.testing.assert_allclose(model.predict_proba(X)[:, 1], booster.predict(X))